@@ -0,0 +1,251 @@
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+import candle_store
+from candle_store import CandleFetchError
+from forecast_cache import CANDLE_SECONDS
+import prediction_store
+
+# --- Configuration ---
+# -----------------------------------------------------------------------------
+SCORE_INTERVAL = float(os.getenv("ACCURACY_SCORE_INTERVAL", "60"))
+# Matured predictions scored per pass; the rest wait for the next pass.
+SCORE_BATCH = int(os.getenv("ACCURACY_SCORE_BATCH", "5000"))
+# Predictions whose target candle is still unavailable this long after it closed are
+# marked scored without actuals so they stop being retried.
+GIVE_UP_SECONDS = float(os.getenv("ACCURACY_GIVE_UP_HOURS", "168")) * 3600
+
+FREQUENCY_UNITS = {'hourly': 'hour', 'daily': 'day'}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS accuracy_stats (
+    scope TEXT NOT NULL,
+    key TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    sum_abs_error REAL NOT NULL,
+    sum_pct_error REAL NOT NULL,
+    sum_accuracy REAL NOT NULL,
+    direction_n INTEGER NOT NULL,
+    direction_hits INTEGER NOT NULL,
+    PRIMARY KEY (scope, key)
+) WITHOUT ROWID;
+"""
+
+_ACCUMULATE = """
+INSERT INTO accuracy_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(scope, key) DO UPDATE SET
+    n = n + excluded.n,
+    sum_abs_error = sum_abs_error + excluded.sum_abs_error,
+    sum_pct_error = sum_pct_error + excluded.sum_pct_error,
+    sum_accuracy = sum_accuracy + excluded.sum_accuracy,
+    direction_n = direction_n + excluded.direction_n,
+    direction_hits = direction_hits + excluded.direction_hits
+"""
+
+
+def score_errors(predicted, actual, base):
+    """
+    Vectorized per-prediction errors. `base` may contain NaN where the price at prediction
+    time is unknown; those rows are excluded from the directional hit rate.
+    Returns (abs_error, pct_error, accuracy, direction_known, direction_hit) arrays.
+    """
+    abs_error = np.abs(predicted - actual)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct_error = np.where(actual != 0, abs_error / np.abs(actual) * 100.0, 0.0)
+    accuracy = np.maximum(0.0, 100.0 - pct_error)
+    direction_known = ~np.isnan(base)
+    direction_hit = direction_known & (np.sign(predicted - base) == np.sign(actual - base))
+    return abs_error, pct_error, accuracy, direction_known, direction_hit
+
+
+def aggregate(keys, abs_error, pct_error, accuracy, direction_known, direction_hit):
+    """Sums the per-prediction errors by key; returns rows of (key, n, sums...)."""
+    unique, inverse = np.unique(keys, return_inverse=True)
+    size = len(unique)
+    columns = (
+        np.bincount(inverse, minlength=size),
+        np.bincount(inverse, abs_error, size),
+        np.bincount(inverse, pct_error, size),
+        np.bincount(inverse, accuracy, size),
+        np.bincount(inverse, direction_known, size),
+        np.bincount(inverse, direction_hit, size),
+    )
+    return [(str(key), int(n), float(ae), float(pe), float(acc), int(dn), int(dh))
+            for key, n, ae, pe, acc, dn, dh in zip(unique, *columns)]
+
+
+def summarize(row):
+    """Turns an accuracy_stats row into averages; None when nothing has been scored."""
+    if row is None or not row['n']:
+        return None
+    n = row['n']
+    return {
+        "scored": n,
+        "mae": row['sum_abs_error'] / n,
+        "mape": row['sum_pct_error'] / n,
+        "averageAccuracy": row['sum_accuracy'] / n,
+        "directionalAccuracy": row['direction_hits'] / row['direction_n'] * 100.0 if row['direction_n'] else None,
+    }
+
+
+class AccuracyScorer:
+    """
+    Background job that scores matured predictions against the realized candle.
+
+    Each pass reads up to SCORE_BATCH predictions whose target candle has closed, loads the
+    realized candles with one range query per (symbol, frequency), computes all errors in
+    one vectorized step and folds them into running per-user and per-model sums, so reads
+    of a user's or model's accuracy are a single primary-key lookup.
+    """
+
+    def __init__(self, store=None, candles=None, interval=SCORE_INTERVAL, batch_size=SCORE_BATCH):
+        self._store = store
+        self._candles = candles
+        self.interval = interval
+        self.batch_size = batch_size
+        self._local = threading.local()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._cursor = None
+        self.passes = 0
+        self.scored = 0
+
+    @property
+    def store(self):
+        return self._store or prediction_store.get_store()
+
+    @property
+    def candles(self):
+        return self._candles or candle_store.get_store()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.store.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    # --- Reads ---
+    def stats_for(self, scope, key):
+        row = self._conn().execute(
+            "SELECT * FROM accuracy_stats WHERE scope = ? AND key = ?", (scope, key)).fetchone()
+        return summarize(row)
+
+    def user_stats(self, user):
+        return self.stats_for('user', user)
+
+    def model_stats(self):
+        """Per-model (SYMBOL/frequency) summaries."""
+        rows = self._conn().execute("SELECT * FROM accuracy_stats WHERE scope = 'model' ORDER BY key").fetchall()
+        return {row['key']: summarize(row) for row in rows}
+
+    # --- Scoring ---
+    def _realized(self, symbol, frequency, target_ts):
+        """Returns {ts: (o, h, l, c, v)} for the candles covering `target_ts`."""
+        instrument, unit = f'{symbol}-INR', FREQUENCY_UNITS[frequency]
+        start, end = int(target_ts.min()), int(target_ts.max())
+        try:
+            rows = self.candles.get_range(instrument, unit, start)
+        except CandleFetchError:
+            # Too far back to sync in one request (or upstream down): use what is stored.
+            rows = self.candles.range(instrument, unit, start, end)
+        return {row[0]: row[1:] for row in rows}
+
+    def score_once(self, now=None):
+        """Runs one scoring pass; returns the number of predictions scored."""
+        now = time.time() if now is None else now
+        due = self.store.due(now, CANDLE_SECONDS, self.batch_size, self._cursor)
+        # Rows whose candle is not stored yet stay unscored; the next pass continues after
+        # them and wraps around at the end, so they cannot block the rows behind them.
+        self._cursor = (due[-1]['target_ts'], due[-1]['id']) if len(due) == self.batch_size else None
+        if not due:
+            return 0
+
+        groups = {}
+        for row in due:
+            groups.setdefault((row['symbol'], row['frequency']), []).append(row)
+
+        ids, users, models, predicted, base, actuals, abandoned = [], [], [], [], [], [], []
+        for (symbol, frequency), rows in groups.items():
+            target_ts = np.fromiter((row['target_ts'] for row in rows), dtype=np.int64, count=len(rows))
+            try:
+                realized = self._realized(symbol, frequency, target_ts)
+            except Exception as e:
+                print(f"Error loading realized candles for {symbol}/{frequency}: {e}")
+                continue
+            for row in rows:
+                candle = realized.get(row['target_ts'])
+                if candle is None:
+                    if now - row['target_ts'] > GIVE_UP_SECONDS:
+                        abandoned.append(row['id'])
+                    continue
+                ids.append(row['id'])
+                users.append(row['user'])
+                models.append(f"{symbol}/{frequency}")
+                predicted.append(row['predicted_close'])
+                base.append(np.nan if row['base_price'] is None else row['base_price'])
+                actuals.append(candle)
+        if not ids and not abandoned:
+            return 0
+
+        actuals = np.asarray(actuals, dtype=np.float64).reshape(-1, 5)
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # Only rows this pass actually claims count towards the sums, so concurrent
+            # scorers (e.g. one per pre-forked worker) never double count.
+            claimed = np.zeros(len(ids), dtype=bool)
+            for i, (row_id, candle) in enumerate(zip(ids, actuals)):
+                cursor = conn.execute(
+                    "UPDATE predictions SET actual_open = ?, actual_high = ?, actual_low = ?, actual_close = ?, "
+                    "actual_volume = ?, scored_at = ? WHERE id = ? AND scored_at IS NULL",
+                    (*map(float, candle), now, row_id))
+                claimed[i] = cursor.rowcount == 1
+            conn.executemany("UPDATE predictions SET scored_at = ? WHERE id = ? AND scored_at IS NULL",
+                             ((now, row_id) for row_id in abandoned))
+
+            if claimed.any():
+                errors = score_errors(np.asarray(predicted, dtype=np.float64)[claimed], actuals[claimed, 3],
+                                      np.asarray(base, dtype=np.float64)[claimed])
+                for scope, keys in (('user', users), ('model', models)):
+                    rows = aggregate(np.asarray(keys, dtype=object)[claimed], *errors)
+                    conn.executemany(_ACCUMULATE, ((scope,) + row for row in rows))
+
+        scored = int(claimed.sum())
+        self.scored += scored
+        return scored
+
+    # --- Background loop ---
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                while self.score_once() >= self.batch_size:
+                    pass
+            except Exception as e:
+                print(f"Accuracy scoring failed: {e}")
+            self.passes += 1
+            self._stop.wait(self.interval)
+
+    def ensure_started(self):
+        """Starts the background scorer on first use."""
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="accuracy-scorer", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+# Shared instance used by app.
+scorer = AccuracyScorer()
@@ -1,24 +1,27 @@
-import requests, os
 from datetime import datetime, timedelta
 
-API_KEY = os.getenv("COINDESK_API_KEY")
+import candle_store
+import metrics
+import upstream
+from response_cache import HISTORY_STALE, HISTORY_TTL, TICK_STALE, TICK_TTL, cached
 
+LATEST_TICK_PATH = "/index/cc/v1/latest/tick"
+HISTORY_FIELDS = ("timestamp", "open", "high", "low", "close", "volume")
+
+@metrics.timed("api_client.fetch_coin_24h_change")
+@cached(TICK_TTL, TICK_STALE)
 def fetch_coin_24h_change(symbol: str):
     """
     Fetch last 24h percentage change for a given coin using CoinDesk API.
     """
-    url = "https://data-api.coindesk.com/index/cc/v1/latest/tick"
     params = {
         "market": "cadli",
         "instruments": f"{symbol}-INR",
-        "apply_mapping": "true",
-        "api_key": API_KEY
+        "apply_mapping": "true"
     }
     
     try:
-        r = requests.get(url, params=params, timeout=10)
-        r.raise_for_status()
-        data = r.json()
+        data = upstream.get_client().get_json(LATEST_TICK_PATH, params)
         
         # The response structure: {'Data': {'BTC-INR': { ... }}, 'Err': {}}
         if 'Data' in data and data['Data']:
@@ -47,68 +50,55 @@ def fetch_coin_24h_change(symbol: str):
     except Exception as e:
         return {"symbol": symbol, "error": str(e)}
 
-def fetch_coin_history(symbol: str, days: int = 30):
+@metrics.timed("api_client.fetch_coin_history")
+@cached(HISTORY_TTL, HISTORY_STALE)
+def fetch_coin_history(symbol: str, days: int = 30, columnar: bool = False):
     """
-    Fetch historical data for a coin using CoinDesk API.
+    Fetch historical data for a coin, served from the local candle store.
+    Only days newer than the last stored candle are fetched from the CoinDesk API.
+    With columnar=True returns {field: [values]} instead of a list of per-day dicts.
     """
-    url = "https://data-api.coindesk.com/index/cc/v1/historical/days"
     end_time = int(datetime.now().timestamp())
     start_time = int((datetime.now() - timedelta(days=days)).timestamp())
     
-    params = {
-        "market": "cadli",
-        "instrument": f"{symbol}-INR",
-        "start_ts": start_time,
-        "end_ts": end_time,
-        "api_key": API_KEY,
-        "aggregate": 1,
-        "fill": "true",
-        "apply_mapping": "true",
-        "response_format": "JSON"
-    }
-    
     try:
-        r = requests.get(url, params=params, timeout=10)
-        r.raise_for_status()
-        data = r.json()
-        
-        if 'Data' in data and isinstance(data['Data'], list):
-            # Return only essential data for the graph
-            simplified_data = []
-            for day_data in data['Data']:
-                simplified_data.append({
-                    "timestamp": day_data.get('TIMESTAMP'),
-                    "open": day_data.get('OPEN'),
-                    "high": day_data.get('HIGH'),
-                    "low": day_data.get('LOW'),
-                    "close": day_data.get('CLOSE'),
-                    "volume": day_data.get('VOLUME')
-                })
-            return simplified_data
-        else:
-            return {"error": "Unexpected API response format", "received_data": data}
-            
+        rows = candle_store.get_store().get_range(f"{symbol}-INR", "day", start_time, end_time)
     except Exception as e:
         return {"error": str(e)}
+    
+    if columnar:
+        columns = tuple(zip(*rows)) or ((),) * len(HISTORY_FIELDS)
+        return {field: list(values) for field, values in zip(HISTORY_FIELDS, columns)}
+    
+    # Return only essential data for the graph
+    simplified_data = []
+    for ts, open_, high, low, close, volume in rows:
+        simplified_data.append({
+            "timestamp": ts,
+            "open": open_,
+            "high": high,
+            "low": low,
+            "close": close,
+            "volume": volume
+        })
+    return simplified_data
 
+@metrics.timed("api_client.fetch_multiple_coins_24h_change")
+@cached(TICK_TTL, TICK_STALE)
 def fetch_multiple_coins_24h_change(symbols):
     """
     Fetch 24h change for multiple coins in a single API call.
     """
-    url = "https://data-api.coindesk.com/index/cc/v1/latest/tick"
     instruments = ",".join([f"{symbol}-INR" for symbol in symbols])
     
     params = {
         "market": "cadli",
         "instruments": instruments,
-        "apply_mapping": "true",
-        "api_key": API_KEY
+        "apply_mapping": "true"
     }
     
     try:
-        r = requests.get(url, params=params, timeout=10)
-        r.raise_for_status()
-        data = r.json()
+        data = upstream.get_client().get_json(LATEST_TICK_PATH, params)
         
         results = []
         if 'Data' in data and data['Data']:
@@ -132,4 +122,21 @@ def fetch_multiple_coins_24h_change(symbols):
         return results
             
     except Exception as e:
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
+
+@metrics.timed("api_client.fetch_latest_ticks")
+def fetch_latest_ticks(symbols):
+    """
+    Fetch the raw latest tick for multiple coins in a single API call.
+    Returns a dict of symbol -> tick fields; coins missing from the response are omitted.
+    Raises upstream.UpstreamError on failure.
+    """
+    params = {
+        "market": "cadli",
+        "instruments": ",".join([f"{symbol}-INR" for symbol in symbols]),
+        "apply_mapping": "true"
+    }
+    
+    data = upstream.get_client().get_json(LATEST_TICK_PATH, params)
+    ticks = data.get('Data') or {}
+    return {symbol: ticks[f"{symbol}-INR"] for symbol in symbols if ticks.get(f"{symbol}-INR")}
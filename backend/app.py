@@ -1,13 +1,31 @@
-from flask import Flask, request, jsonify
+from dotenv import load_dotenv
+load_dotenv()  # before the local imports below, which read their configuration at import time
+
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
-import jwt
 import datetime
-import random
 import time
 from functools import wraps
 
+import metrics
+import api_client
+import auth
+import coin_catalog
+import inference_runtime
+import prediction_engine
+from inference_batcher import batcher
+from market_refresher import MarketRefresher
+from forecast_cache import CANDLE_SECONDS, forecast_cache
+from forecast_scheduler import scheduler as forecast_scheduler
+import prediction_jobs
+import prediction_store
+from accuracy_scorer import scorer
+from streaming import StreamHub, TooManySubscribers
+import response_encoding
+from response_encoding import UnsupportedFormat
+
 app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes
+CORS(app, expose_headers=['X-Next-Cursor', 'Location', 'Retry-After'])  # Enable CORS for all routes
 
 # Configuration
 app.config['SECRET_KEY'] = 'your-secret-key-change-this-in-production'
@@ -156,81 +174,201 @@ GLOBAL_STATS = {
     "fearGreedIndex": 72,
 }
 
+# Coin ids, symbols, instruments and model availability, indexed once at startup
+coin_catalog.refresh(DUMMY_COINS)
+
+# Live market data: polled in the background, served from an immutable snapshot
+market = MarketRefresher(DUMMY_COINS, GLOBAL_STATS)
+stream_hub = StreamHub(market, forecast_cache)
+
+# Upper bound on items accepted by /api/prediction/batch
+MAX_BATCH_ITEMS = 50
+
+# Upper bound on ?days= for /api/coins/<symbol>/history
+MAX_HISTORY_DAYS = 2000
+
+CHART_FIELDS = ("time", "price", "volume")
+
 # Mock user database - replace with real database
 USERS = {}
 
+# Verified tokens are cached, so repeat requests skip the HMAC check
+token_verifier = auth.TokenVerifier(auth.KEYS or {'default': app.config['SECRET_KEY']}, auth.ACTIVE_KID)
+
 # Helper functions
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = request.headers.get('Authorization')
-        if not token:
-            return jsonify({'message': 'Token is missing!'}), 401
-        
         try:
-            if token.startswith('Bearer '):
-                token = token[7:]
-            data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
-            current_user = data['username']
-        except:
-            return jsonify({'message': 'Token is invalid!'}), 401
+            current_user = token_verifier.verify_header(request.headers.get('Authorization'))
+        except auth.AuthError as e:
+            return jsonify({'message': e.message, 'reason': e.reason}), 401
         
         return f(current_user, *args, **kwargs)
     return decorated
 
-def generate_chart_data(timeframe, units):
-    """Generate mock chart data for predictions"""
-    data_points = units if timeframe == "hourly" else units * 24
-    data = []
-    base_price = 50000 + random.random() * 20000
-    
-    for i in range(data_points):
-        change = (random.random() - 0.5) * 0.05  # ±2.5% change
-        base_price = base_price * (1 + change)
-        data.append({
-            "time": i,
-            "price": round(base_price * 100) / 100,
-            "volume": round((random.random() * 1000000000 + 500000000) * 100) / 100,
-        })
-    
-    return data
-
 def get_real_crypto_data():
     """
-    Replace this function with real API calls to cryptocurrency data providers
-    like CoinGecko, CoinMarketCap, or Binance API
+    Returns the latest coin list from the background market refresher.
+    Falls back to the static DUMMY_COINS until the first refresh succeeds.
     """
-    # TODO: Implement real API calls
-    # Example: requests.get('https://api.coingecko.com/api/v3/coins/markets?vs_currency=usd&order=market_cap_desc&per_page=10&page=1')
-    return DUMMY_COINS
+    market.ensure_started()
+    return list(market.snapshot().coins)
+
+def snapshot_response(body, etag, snapshot):
+    """Serve a pre-encoded snapshot body with ETag/Last-Modified revalidation"""
+    if request.if_none_match.contains(etag) or (
+            not request.if_none_match and request.if_modified_since
+            and request.if_modified_since.timestamp() >= int(snapshot.updated_at)):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Last-Modified'] = snapshot.last_modified
+    response.headers['Cache-Control'] = f'public, max-age={int(market.interval)}'
+    return response
 
-def generate_ai_prediction(coin_id, timeframe, units):
+def generate_ai_prediction(user, coin_id, symbol, timeframe, units):
     """
-    Replace this function with real AI/ML prediction logic
-    This could integrate with TensorFlow, PyTorch, or external ML APIs
+    Runs the model for one prediction and records it; called on a prediction-job worker.
+    Returns the /api/prediction response body, or a dict with an 'error' key.
     """
-    # TODO: Implement real AI prediction model
-    # This is where you'd load your trained model and make predictions
-    base_coin = next((coin for coin in DUMMY_COINS if coin["id"] == coin_id), None)
-    if not base_coin:
-        return None
-    
-    # Mock prediction logic - replace with real ML model
-    predicted_price = base_coin["price"] * (1 + (random.random() - 0.5) * 0.1)
-    predicted_volume = base_coin["volume24h"] * (1 + (random.random() - 0.5) * 0.2)
-    confidence = round(75 + random.random() * 20)
+    uncertainty = prediction_engine.predict_distribution(symbol, timeframe, units)
+    if "error" in uncertainty:
+        return uncertainty
+    horizon = prediction_engine.predict_horizon(symbol, timeframe)
+    if "error" in horizon:
+        return horizon
     
-    return {
+    step = uncertainty["predicted_values"]
+    quantiles = uncertainty["quantiles"]
+    curve = horizon["predicted_values"]
+    targets = horizon["target_timestamps"]
+    target_ts = targets[units - 1] if targets else prediction_target_ts(timeframe, units)
+    prediction = {
         "coin": coin_id,
-        "symbol": base_coin["symbol"],
+        "symbol": symbol,
         "timeframe": timeframe,
         "units": units,
-        "predictedPrice": predicted_price,
-        "predictedVolume": predicted_volume,
-        "confidence": confidence,
-        "chartData": generate_chart_data(timeframe, units),
+        "predictedPrice": step["close"],
+        "predictedVolume": step["volume"],
+        "confidence": round(uncertainty["confidence"]),
+        "confidenceBand": {
+            "low": quantiles["0.05"]["close"],
+            "median": quantiles["0.5"]["close"],
+            "high": quantiles["0.95"]["close"],
+            "samples": uncertainty["samples"],
+        },
+        "basePrice": uncertainty["last_close"],
+        "targetTime": utc_iso(target_ts),
+        "chartData": [{"time": i + 1, "price": curve["close"][i], "volume": curve["volume"][i]}
+                      for i in range(units)],
+    }
+    
+    # Queued for the background writer; never blocks on disk
+    prediction_store.get_store().record({
+        "user": user,
+        "coin": coin_id,
+        "symbol": symbol,
+        "frequency": timeframe,
+        "units": units,
+        "window_end_ts": horizon["window_end_timestamp"],
+        "target_ts": target_ts,
+        "base_price": prediction["basePrice"],
+        "predicted_open": step["open"],
+        "predicted_high": step["high"],
+        "predicted_low": step["low"],
+        "predicted_close": step["close"],
+        "predicted_volume": step["volume"],
+        "confidence": prediction["confidence"],
+    })
+    return prediction
+
+def generate_batch_predictions(tuples):
+    """Runs prediction_engine.predict_batch for a batch job; per-item errors stay in the results"""
+    return {"results": prediction_engine.predict_batch(tuples)}
+
+def queue_full_response(e):
+    """429 for a submission the prediction job queue rejected"""
+    response = jsonify({"error": str(e)})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
+
+def prediction_job_response(job, status, fmt):
+    """Shape a prediction job: the prediction once done, 202 while pending, an error otherwise"""
+    if status == prediction_jobs.DONE and "results" in job.result:
+        # A batch job (generate_batch_predictions); its items keep their own format
+        with metrics.span('serialize'):
+            return jsonify(dict(job.result, jobId=job.id))
+    if status == prediction_jobs.DONE:
+        prediction = dict(job.result, jobId=job.id)
+        # ?format=columnar|f32|msgpack sends chartData as parallel arrays instead of records
+        with metrics.span('serialize'):
+            prediction["chartData"] = response_encoding.shape_records(prediction["chartData"], CHART_FIELDS, fmt)
+            return response_encoding.respond_as(prediction, fmt)
+    
+    body = {"jobId": job.id, "status": status}
+    if status == prediction_jobs.FAILED:
+        body["error"] = job.error
+        return jsonify(body), 502
+    if status == prediction_jobs.EXPIRED:
+        body["error"] = job.error or "Prediction was not started before its deadline"
+        return jsonify(body), 504
+    response = jsonify(body)
+    response.status_code = 202
+    response.headers['Location'] = f"/api/prediction/jobs/{job.id}"
+    response.headers['Retry-After'] = '1'
+    return response
+
+def requested_wait(default):
+    """Seconds a prediction request may block for its job (?wait=); raises ValueError"""
+    wait = float(request.args.get('wait', default))
+    if not 0 <= wait <= prediction_jobs.MAX_WAIT_SECONDS:
+        raise ValueError(f"'wait' must be between 0 and {prediction_jobs.MAX_WAIT_SECONDS:g}")
+    return wait
+
+def prediction_target_ts(timeframe, units, now=None):
+    """Open time of the candle `units` candles after the current one"""
+    interval = CANDLE_SECONDS[timeframe]
+    now = time.time() if now is None else now
+    return (int(now) // interval + int(units)) * interval
+
+def utc_iso(ts):
+    """ISO 8601 UTC time for a Unix timestamp, e.g. 2024-01-01T00:00:00Z"""
+    return datetime.datetime.fromtimestamp(ts, datetime.timezone.utc).replace(tzinfo=None).isoformat() + "Z"
+
+def history_item(row):
+    """Shape a stored prediction row like the /api/prediction response"""
+    return {
+        "id": str(row["id"]),
+        "coin": row["coin"],
+        "symbol": row["symbol"],
+        "timeframe": row["frequency"],
+        "units": row["units"],
+        "predictedPrice": row["predicted_close"],
+        "predictedVolume": row["predicted_volume"],
+        "confidence": row["confidence"],
+        "basePrice": row["base_price"],
+        "targetTime": utc_iso(row["target_ts"]),
+        "timestamp": utc_iso(row["created_at"]),
     }
 
+# Per-request stage timings, returned as a Server-Timing header when asked for
+@app.before_request
+def start_server_timing():
+    if metrics.ENABLED and (metrics.SERVER_TIMING_ALWAYS or request.args.get('timing') == '1'):
+        g.timing_token = metrics.start_request_timing()
+
+@app.after_request
+def add_server_timing(response):
+    token = g.pop('timing_token', None)
+    if token is not None:
+        header = metrics.stop_request_timing(token)
+        if header:
+            response.headers['Server-Timing'] = header
+    return response
+
 # API Routes
 
 @app.route('/api/health', methods=['GET'])
@@ -252,10 +390,7 @@ def login():
     # Check against database, hash passwords, etc.
     if username in USERS and USERS[username]['password'] == password:
         # Generate JWT token
-        token = jwt.encode({
-            'username': username,
-            'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=24)
-        }, app.config['SECRET_KEY'], algorithm='HS256')
+        token = token_verifier.issue(username)
         
         return jsonify({
             "success": True,
@@ -265,10 +400,7 @@ def login():
     else:
         # For demo purposes, accept any login
         USERS[username] = {"password": password}
-        token = jwt.encode({
-            'username': username,
-            'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=24)
-        }, app.config['SECRET_KEY'], algorithm='HS256')
+        token = token_verifier.issue(username)
         
         return jsonify({
             "success": True,
@@ -301,69 +433,184 @@ def signup():
 @app.route('/api/coins', methods=['GET'])
 def get_coins():
     """Get cryptocurrency data"""
-    # TODO: Replace with real cryptocurrency API calls
-    coins = get_real_crypto_data()
-    return jsonify(coins)
+    market.ensure_started()
+    snapshot = market.snapshot()
+    return snapshot_response(snapshot.coins_body, snapshot.coins_etag, snapshot)
+
+@app.route('/api/coins/<symbol>/history', methods=['GET'])
+def get_coin_history(symbol):
+    """Daily OHLCV history for a coin; ?format=columnar|f32|msgpack for compact arrays"""
+    try:
+        fmt = response_encoding.requested_format()
+        days = int(request.args.get('days', 30))
+    except UnsupportedFormat as e:
+        return jsonify({"error": str(e)}), 400
+    except ValueError:
+        return jsonify({"error": "'days' must be an integer"}), 400
+    if not 1 <= days <= MAX_HISTORY_DAYS:
+        return jsonify({"error": f"'days' must be between 1 and {MAX_HISTORY_DAYS}"}), 400
+    
+    history = api_client.fetch_coin_history(symbol.upper(), days, columnar=fmt != 'json')
+    if isinstance(history, dict) and "error" in history:
+        return jsonify(history), 502
+    
+    with metrics.span('serialize'):
+        if fmt != 'json':
+            history = response_encoding.shape_columns(history, fmt)
+        return response_encoding.respond_as({"symbol": symbol.upper(), "history": history}, fmt)
 
 @app.route('/api/global-stats', methods=['GET'])
 def get_global_stats():
     """Get global market statistics"""
-    # TODO: Replace with real market data API calls
-    return jsonify(GLOBAL_STATS)
+    market.ensure_started()
+    snapshot = market.snapshot()
+    return snapshot_response(snapshot.global_body, snapshot.global_etag, snapshot)
+
+@app.route('/api/stream', methods=['GET'])
+def stream_updates():
+    """Server-Sent Events stream of tick deltas and refreshed forecasts"""
+    symbols = [s for s in request.args.get('symbols', '').upper().split(',') if s]
+    frequencies = [f for f in request.args.get('forecasts', '').lower().split(',') if f]
+    
+    market.ensure_started()
+    if frequencies:
+        forecast_scheduler.ensure_started()
+    try:
+        subscriber = stream_hub.subscribe(symbols or None, frequencies)
+    except TooManySubscribers:
+        return jsonify({"error": "Too many stream subscribers"}), 503
+    
+    response = Response(stream_hub.stream(subscriber), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
 @app.route('/api/prediction', methods=['POST'])
 @token_required
 def create_prediction(current_user):
-    """Generate AI prediction for cryptocurrency"""
-    data = request.get_json()
+    """
+    Submit a prediction job. Answers with the prediction if it finishes within ?wait= seconds
+    (default PREDICTION_SYNC_WAIT), otherwise 202 with a job id to poll
+    """
+    try:
+        fmt = response_encoding.requested_format()
+        wait = requested_wait(prediction_jobs.SYNC_WAIT_SECONDS)
+    except (UnsupportedFormat, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    
+    data = request.get_json(silent=True) or {}
     coin = data.get('coin')
     timeframe = data.get('timeframe')
     units = data.get('units')
     
     if not all([coin, timeframe, units]):
         return jsonify({"error": "Missing required parameters"}), 400
+    if timeframe not in CANDLE_SECONDS:
+        return jsonify({"error": "Invalid timeframe. Please use 'hourly' or 'daily'."}), 400
+    try:
+        units = int(units)
+    except (TypeError, ValueError):
+        return jsonify({"error": "'units' must be an integer"}), 400
+    horizon = prediction_engine.FREQUENCY_PARAMS[timeframe]['horizon']
+    if not 1 <= units <= horizon:
+        return jsonify({"error": f"'units' must be between 1 and {horizon} for {timeframe} predictions"}), 400
+    catalog = coin_catalog.get_catalog()
+    symbol = catalog.symbol_for_id(coin)
+    if symbol is None:
+        return jsonify({"error": "Invalid coin ID"}), 400
+    if not catalog.has_model(symbol, timeframe, inference_runtime.resolve_backend()):
+        return jsonify({"error": f"No {timeframe} model for {symbol}"}), 400
     
-    # TODO: Replace with real AI prediction logic
-    prediction = generate_ai_prediction(coin, timeframe, units)
+    # The model runs on the bounded job pool, never on this request thread
+    scorer.ensure_started()
+    forecast_scheduler.ensure_started()
+    try:
+        job = prediction_jobs.jobs.submit(current_user, generate_ai_prediction,
+                                          current_user, coin, symbol, timeframe, units)
+    except prediction_jobs.QueueFull as e:
+        return queue_full_response(e)
     
-    if not prediction:
-        return jsonify({"error": "Invalid coin ID"}), 400
+    return prediction_job_response(job, prediction_jobs.jobs.wait(job, wait), fmt)
+
+@app.route('/api/prediction/jobs/<job_id>', methods=['GET'])
+@token_required
+def get_prediction_job(current_user, job_id):
+    """Poll a prediction job; ?wait=N long-polls up to N seconds for it to finish"""
+    try:
+        fmt = response_encoding.requested_format()
+        wait = requested_wait(0)
+    except (UnsupportedFormat, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    
+    job = prediction_jobs.jobs.get(job_id, current_user)
+    if job is None:
+        return jsonify({"error": "Prediction job not found"}), 404
+    return prediction_job_response(job, prediction_jobs.jobs.wait(job, wait), fmt)
+
+@app.route('/api/prediction/batch', methods=['POST'])
+@token_required
+def create_prediction_batch(current_user):
+    """
+    Submit a job generating model predictions for many (symbol, frequency, n) items at once.
+    Answers with the results if they finish within ?wait= seconds, otherwise 202 with a job id
+    """
+    try:
+        wait = requested_wait(prediction_jobs.SYNC_WAIT_SECONDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    data = request.get_json(silent=True) or {}
+    items = data.get('items')
+    
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "'items' must be a non-empty list"}), 400
+    if len(items) > MAX_BATCH_ITEMS:
+        return jsonify({"error": f"At most {MAX_BATCH_ITEMS} items per batch"}), 400
     
-    # TODO: Save prediction to database for history tracking
+    # Accept both [symbol, frequency, n] and {"symbol", "frequency", "n"} items
+    tuples = []
+    for item in items:
+        if isinstance(item, dict):
+            tuples.append((item.get('symbol'), item.get('frequency'), item.get('n')))
+        else:
+            tuples.append(item)
     
-    return jsonify(prediction)
+    # Keeps the forecast cache warm from the next candle boundary on
+    forecast_scheduler.ensure_started()
+    # Like single predictions, the batch runs on the bounded job pool under its deadline
+    try:
+        job = prediction_jobs.jobs.submit(current_user, generate_batch_predictions, tuples)
+    except prediction_jobs.QueueFull as e:
+        return queue_full_response(e)
+    
+    return prediction_job_response(job, prediction_jobs.jobs.wait(job, wait), None)
+
+@app.route('/api/inference/stats', methods=['GET'])
+def get_inference_stats():
+    """Micro-batcher queue depth, batch-size and wait-time metrics"""
+    return jsonify(batcher.stats())
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus metrics: per-stage latency histograms, upstream latency/errors, cache hit rates"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/api/predictions/history', methods=['GET'])
 @token_required
 def get_prediction_history(current_user):
-    """Get user's prediction history"""
-    # TODO: Replace with real database query for user's predictions
-    dummy_predictions = [
-        {
-            "id": "1",
-            "coin": "bitcoin",
-            "symbol": "BTC",
-            "timeframe": "hourly",
-            "units": 6,
-            "predictedPrice": 68200.0,
-            "predictedVolume": 29000000000,
-            "confidence": 85,
-            "timestamp": "2024-01-15T10:30:00Z",
-        },
-        {
-            "id": "2",
-            "coin": "ethereum",
-            "symbol": "ETH",
-            "timeframe": "daily",
-            "units": 7,
-            "predictedPrice": 3580.0,
-            "predictedVolume": 16800000000,
-            "confidence": 78,
-            "timestamp": "2024-01-14T15:45:00Z",
-        },
-    ]
+    """Get user's prediction history, newest first, one page at a time"""
+    try:
+        limit = int(request.args.get('limit', prediction_store.DEFAULT_PAGE_SIZE))
+        rows, next_cursor = prediction_store.get_store().history(
+            current_user, limit, request.args.get('cursor'))
+    except ValueError:
+        return jsonify({"error": "Invalid limit or cursor"}), 400
     
-    return jsonify(dummy_predictions)
+    response = jsonify([history_item(row) for row in rows])
+    if next_cursor:
+        # Pass back as ?cursor= to fetch the next page
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
 
 @app.route('/api/prediction/accuracy', methods=['POST'])
 @token_required
@@ -375,13 +622,30 @@ def calculate_prediction_accuracy(current_user):
     if not prediction:
         return jsonify({"error": "Prediction data required"}), 400
     
-    # TODO: Replace with real accuracy calculation logic
-    current_coin = next((coin for coin in DUMMY_COINS if coin["id"] == prediction["coin"]), None)
-    if not current_coin:
-        return jsonify({"error": "Coin not found"}), 404
+    # Stored predictions (e.g. from the history) are scored in the background
+    # against the realized candle; this is a single-row lookup
+    if prediction.get("id") is not None:
+        try:
+            row = prediction_store.get_store().get(int(prediction["id"]))
+        except (TypeError, ValueError):
+            row = None
+        if row is None or row["user"] != current_user:
+            return jsonify({"error": "Prediction not found"}), 404
+        if row["scored_at"] is None:
+            return jsonify({"status": "pending", "targetTime": history_item(row)["targetTime"]}), 202
+        if row["actual_close"] is None:
+            return jsonify({"error": "Realized price unavailable"}), 404
+        actual_price = row["actual_close"]
+        predicted_price = row["predicted_close"]
+    else:
+        # Not stored yet: compare against the latest market price
+        market.ensure_started()
+        current_coin = market.snapshot().coins_by_id.get(prediction.get("coin"))
+        if not current_coin:
+            return jsonify({"error": "Coin not found"}), 404
+        actual_price = current_coin["price"]
+        predicted_price = prediction["predictedPrice"]
     
-    actual_price = current_coin["price"]
-    predicted_price = prediction["predictedPrice"]
     accuracy = max(0, 100 - abs(((actual_price - predicted_price) / actual_price) * 100))
     
     result = {
@@ -393,17 +657,26 @@ def calculate_prediction_accuracy(current_user):
     
     return jsonify(result)
 
+@app.route('/api/models/accuracy', methods=['GET'])
+def get_model_accuracy():
+    """Running MAE, MAPE and directional hit rate per model (SYMBOL/frequency)"""
+    scorer.ensure_started()
+    return jsonify(scorer.model_stats())
+
 @app.route('/api/user/profile', methods=['GET'])
 @token_required
 def get_user_profile(current_user):
     """Get current user profile"""
     # TODO: Replace with real user profile data from database
+    scorer.ensure_started()
+    accuracy = scorer.user_stats(current_user)
     return jsonify({
         "username": current_user,
         "email": f"{current_user}@example.com",  # Mock email
         "joinDate": "2024-01-01T00:00:00Z",
-        "totalPredictions": 15,
-        "averageAccuracy": 78.5
+        "totalPredictions": prediction_store.get_store().total(current_user),
+        "averageAccuracy": round(accuracy["averageAccuracy"], 2) if accuracy else None,
+        "accuracy": accuracy,
     })
 
 # Error handlers
@@ -422,14 +695,19 @@ if __name__ == '__main__':
     print("  POST /api/auth/signup - User registration")
     print("  GET  /api/coins - Get cryptocurrency data")
     print("  GET  /api/global-stats - Get market statistics")
+    print("  GET  /api/coins/<symbol>/history - Daily OHLCV history")
+    print("  GET  /api/stream - Live tick/forecast updates (Server-Sent Events)")
     print("  POST /api/prediction - Generate AI prediction (requires auth)")
+    print("  GET  /api/prediction/jobs/<id> - Poll a queued prediction (requires auth)")
+    print("  POST /api/prediction/batch - Batched model predictions (requires auth)")
     print("  GET  /api/predictions/history - Get prediction history (requires auth)")
     print("  POST /api/prediction/accuracy - Calculate prediction accuracy (requires auth)")
     print("  GET  /api/user/profile - Get user profile (requires auth)")
+    print("  GET  /api/models/accuracy - Running accuracy per model")
+    print("  GET  /api/inference/stats - Inference batcher metrics")
+    print("  GET  /api/metrics - Prometheus metrics")
     print("  GET  /api/health - Health check")
     print("\n🔧 TODO: Replace mock functions with real implementations:")
-    print("  - get_real_crypto_data(): Connect to CoinGecko/CoinMarketCap API")
-    print("  - generate_ai_prediction(): Implement ML prediction model")
     print("  - User authentication: Add proper password hashing & database")
     print("  - Database integration: Replace mock data with real database")
     
@@ -0,0 +1,146 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+
+import metrics
+
+# --- Configuration ---
+# -----------------------------------------------------------------------------
+# Signing keys as "kid=secret,kid=secret". Tokens are signed with JWT_ACTIVE_KID (default: the
+# first key); every listed key still verifies, so a key can be rotated out once its tokens expire.
+# When unset, app's SECRET_KEY is the only key.
+KEYS = dict(item.split('=', 1) for item in os.getenv("JWT_KEYS", "").split(',') if '=' in item)
+ACTIVE_KID = os.getenv("JWT_ACTIVE_KID") or None
+ALGORITHM = 'HS256'
+# Verified tokens remembered; a hit skips the HMAC check and claims parsing.
+CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+# Cached tokens are re-verified at least this often, even if `exp` is further away.
+CACHE_TTL = float(os.getenv("AUTH_TOKEN_CACHE_TTL", "300"))
+# Seconds of clock skew tolerated on `exp`.
+LEEWAY = float(os.getenv("AUTH_LEEWAY", "0"))
+TOKEN_LIFETIME_HOURS = 24
+
+
+class AuthError(Exception):
+    """
+    Raised when a request cannot be authenticated. `reason` is a stable code for clients:
+    missing, malformed, expired, bad_signature, unknown_key or invalid_claims.
+    """
+
+    def __init__(self, reason, message):
+        super().__init__(message)
+        self.reason = reason
+        self.message = message
+
+
+class TokenVerifier:
+    """
+    Verifies HS256 bearer tokens and remembers the ones that passed.
+
+    The cache is an LRU keyed by the SHA-256 of the token (the token itself is never kept).
+    Each entry holds the decoded claims and expires at the token's `exp` or after CACHE_TTL,
+    whichever is sooner, so an expired token is rejected even on a cache hit. Tokens name
+    their signing key in the `kid` header; tokens without one (issued before rotation was
+    configured) are tried against every key, active key first.
+    """
+
+    def __init__(self, keys, active_kid=None, cache_size=CACHE_SIZE, cache_ttl=CACHE_TTL, leeway=LEEWAY):
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.leeway = leeway
+        self.hits = 0
+        self.misses = 0
+        self.set_keys(keys, active_kid)
+
+    def set_keys(self, keys, active_kid=None):
+        """Replaces the key set and drops every cached verification."""
+        if not keys:
+            raise ValueError("At least one signing key is required")
+        active_kid = active_kid or next(iter(keys))
+        if active_kid not in keys:
+            raise ValueError(f"Active key '{active_kid}' is not in the key set")
+        with self._lock:
+            self.keys = dict(keys)
+            self.active_kid = active_kid
+            self._cache.clear()
+
+    def issue(self, username, lifetime_hours=TOKEN_LIFETIME_HOURS):
+        """Signs a token for `username` with the active key."""
+        exp = int(time.time() + lifetime_hours * 3600)
+        return jwt.encode({'username': username, 'exp': exp}, self.keys[self.active_kid],
+                          algorithm=ALGORITHM, headers={'kid': self.active_kid})
+
+    def verify(self, token):
+        """Returns the token's claims; raises AuthError."""
+        digest = hashlib.sha256(token.encode()).digest()
+        now = time.time()
+        with self._lock:
+            cached = self._cache.get(digest)
+            if cached is not None:
+                claims, expires_at = cached
+                if now < expires_at:
+                    self._cache.move_to_end(digest)
+                    self.hits += 1
+                    metrics.cache_event('auth', True)
+                    return claims
+                del self._cache[digest]
+            self.misses += 1
+        metrics.cache_event('auth', False)
+
+        claims = self._decode(token)
+        exp = claims.get('exp')
+        expires_at = now + self.cache_ttl
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, exp + self.leeway)
+        with self._lock:
+            self._cache[digest] = (claims, expires_at)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return claims
+
+    def verify_header(self, authorization):
+        """Verifies an `Authorization: Bearer <token>` header value; returns the username."""
+        if not authorization:
+            raise AuthError('missing', 'Token is missing!')
+        token = authorization[7:] if authorization.startswith('Bearer ') else authorization
+        username = self.verify(token).get('username')
+        if not isinstance(username, str) or not username:
+            raise AuthError('invalid_claims', 'Token has no username')
+        return username
+
+    def _decode(self, token):
+        try:
+            kid = jwt.get_unverified_header(token).get('kid')
+        except jwt.InvalidTokenError:
+            # DecodeError, or e.g. a non-string kid, which PyJWT rejects before decoding
+            raise AuthError('malformed', 'Token is malformed')
+        keys = self.keys
+        if kid is not None:
+            if kid not in keys:
+                raise AuthError('unknown_key', 'Token was signed with an unknown or retired key')
+            candidates = [keys[kid]]
+        else:
+            candidates = [keys[self.active_kid]] + [k for kid, k in keys.items() if kid != self.active_kid]
+
+        for key in candidates:
+            try:
+                return jwt.decode(token, key, algorithms=[ALGORITHM], leeway=self.leeway)
+            except jwt.InvalidSignatureError:
+                continue
+            except jwt.ExpiredSignatureError:
+                raise AuthError('expired', 'Token has expired')
+            except jwt.DecodeError:
+                raise AuthError('malformed', 'Token is malformed')
+            except jwt.InvalidTokenError as e:
+                raise AuthError('invalid_claims', f'Token is invalid: {e}')
+        raise AuthError('bad_signature', 'Token signature is invalid')
+
+    def stats(self):
+        with self._lock:
+            return {"cached": len(self._cache), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,156 @@
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+import candle_store
+from accuracy_scorer import FREQUENCY_UNITS, score_errors
+from forecast_cache import CANDLE_SECONDS
+from prediction_engine import COLUMNS_TO_PREDICT, FREQUENCY_PARAMS, available_models, get_model_and_scaler
+
+# --- Configuration ---
+# -----------------------------------------------------------------------------
+DEFAULT_DAYS = 365
+# Windows per forward pass. Large batches amortize per-call overhead; memory is
+# batch * (seq_len + horizon) * 5 floats.
+BATCH_SIZE = 1024
+CLOSE = COLUMNS_TO_PREDICT.index('price_close')
+
+
+def load_history(coin_symbol, frequency, days, offline=False):
+    """Returns (timestamps, (T, 5) float32 OHLCV) covering the last `days` days plus one input window."""
+    params = FREQUENCY_PARAMS[frequency]
+    interval = CANDLE_SECONDS[frequency]
+    end_ts = int(time.time()) // interval * interval - interval  # last closed candle
+    start_ts = end_ts - int(days * 86400) - (params['seq_len'] + params['horizon']) * interval
+    store = candle_store.get_store()
+    instrument, unit = f'{coin_symbol}-INR', FREQUENCY_UNITS[frequency]
+    if offline:
+        rows = store.range(instrument, unit, start_ts, end_ts)
+    else:
+        rows = store.backfill(instrument, unit, start_ts, end_ts)
+    rows = np.asarray(rows, dtype=np.float64).reshape(-1, 6)
+    return rows[:, 0].astype(np.int64), rows[:, 1:].astype(np.float32)
+
+
+def rolling_windows(series, seq_len, horizon, stride=1):
+    """
+    Every (input window, realized horizon) pair in `series`, as zero-copy strided views:
+    inputs (N, seq_len, 5) and targets (N, horizon, 5), where window i covers
+    series[i:i + seq_len] and its targets are the following `horizon` rows.
+    """
+    n = len(series) - seq_len - horizon + 1
+    if n <= 0:
+        raise ValueError(f"Need at least {seq_len + horizon} candles, got {len(series)}.")
+    features = series.shape[1]
+    inputs = sliding_window_view(series, (seq_len, features))[:n:stride, 0]
+    targets = sliding_window_view(series[seq_len:], (horizon, features))[:n:stride, 0]
+    return inputs, targets
+
+
+def predict_windows(model, scaler, series, seq_len, horizon, stride=1, batch_size=BATCH_SIZE):
+    """
+    Forecasts every rolling window of `series`. Returns (predictions, targets, last_close):
+    (N, horizon, 5) forecasts and realized candles, and the close each window ends on.
+    """
+    raw_inputs, targets = rolling_windows(series, seq_len, horizon, stride)
+    # Min-max scaling is per feature, so scaling the series once equals scaling every window.
+    inputs, _ = rolling_windows(scaler.transform(series), seq_len, horizon, stride)
+    predictions = np.empty((len(inputs), horizon, series.shape[1]), dtype=np.float32)
+    for start in range(0, len(inputs), batch_size):
+        batch = np.ascontiguousarray(inputs[start:start + batch_size])
+        predictions[start:start + len(batch)] = np.asarray(
+            model.predict(batch, verbose=0, batch_size=len(batch))).reshape(len(batch), horizon, -1)
+    return scaler.inverse_transform(predictions), targets, raw_inputs[:, -1, CLOSE]
+
+
+def score_horizons(predictions, targets, last_close):
+    """Per-step close-price MAE/MAPE/directional accuracy plus per-feature MAPE, all vectorized."""
+    abs_error, pct_error, _, _, hit = score_errors(
+        predictions[:, :, CLOSE].astype(np.float64), targets[:, :, CLOSE].astype(np.float64),
+        last_close.astype(np.float64)[:, None])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        feature_pct = np.abs(predictions - targets) / np.abs(targets) * 100.0
+    feature_mape = np.nanmean(np.where(np.isfinite(feature_pct), feature_pct, np.nan), axis=(0, 1))
+    return {
+        "horizon": {
+            "mae": abs_error.mean(axis=0).tolist(),
+            "mape": pct_error.mean(axis=0).tolist(),
+            "directional_accuracy": (hit.mean(axis=0) * 100.0).tolist(),
+        },
+        "overall": {
+            "mae": float(abs_error.mean()),
+            "mape": float(pct_error.mean()),
+            "directional_accuracy": float(hit.mean() * 100.0),
+        },
+        "feature_mape": {name: float(v) for name, v in zip(COLUMNS_TO_PREDICT, feature_mape)},
+    }
+
+
+def backtest_model(coin_symbol, frequency, days=DEFAULT_DAYS, backend=None, stride=1,
+                   batch_size=BATCH_SIZE, offline=False):
+    """Backtests one model over the last `days` days of stored candles; returns its report."""
+    params = FREQUENCY_PARAMS[frequency]
+    seq_len, horizon = params['seq_len'], params['horizon']
+    timestamps, series = load_history(coin_symbol, frequency, days, offline)
+    model, scaler = get_model_and_scaler(coin_symbol, frequency, backend)
+
+    started = time.perf_counter()
+    predictions, targets, last_close = predict_windows(model, scaler, series, seq_len, horizon, stride, batch_size)
+    report = score_horizons(predictions, targets, last_close)
+    report.update({
+        "windows": len(predictions),
+        "first_window_end": int(timestamps[seq_len - 1]),
+        "last_window_end": int(timestamps[seq_len - 1 + (len(predictions) - 1) * stride]),
+        "seconds": time.perf_counter() - started,
+    })
+    return report
+
+
+def run(pairs, days=DEFAULT_DAYS, backend=None, stride=1, batch_size=BATCH_SIZE, offline=False):
+    report = {}
+    for coin_symbol, frequency in pairs:
+        key = f"{coin_symbol}/{frequency}"
+        try:
+            report[key] = backtest_model(coin_symbol, frequency, days, backend, stride, batch_size, offline)
+        except (FileNotFoundError, ValueError, candle_store.CandleFetchError) as e:
+            report[key] = {"error": str(e)}
+            print(f"{key:<14} error: {e}")
+            continue
+        r = report[key]
+        print(f"{key:<14} {r['windows']:>6} windows  MAPE step1 {r['horizon']['mape'][0]:6.2f}%  "
+              f"step{len(r['horizon']['mape'])} {r['horizon']['mape'][-1]:6.2f}%  "
+              f"direction {r['overall']['directional_accuracy']:5.1f}%  ({r['seconds']:.1f} s)")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest the shipped models over stored candle history.")
+    parser.add_argument('--symbols', help="comma-separated symbols (default: every model on disk)")
+    parser.add_argument('--frequency', choices=('hourly', 'daily', 'all'), default='all')
+    parser.add_argument('--days', type=float, default=DEFAULT_DAYS)
+    parser.add_argument('--stride', type=int, default=1, help="use every Nth window")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--backend', default=None, help="keras or onnx (default: PREDICTION_BACKEND)")
+    parser.add_argument('--offline', action='store_true', help="only use candles already in the store")
+    parser.add_argument('--output', default='backtest_report.json')
+    args = parser.parse_args(argv)
+
+    symbols = set(args.symbols.upper().split(',')) if args.symbols else None
+    pairs = [(s, f) for s, f in available_models()
+             if (symbols is None or s in symbols) and args.frequency in ('all', f)]
+    started = time.perf_counter()
+    report = run(pairs, args.days, args.backend, args.stride, args.batch_size, args.offline)
+    print(f"Backtested {len(pairs)} models in {time.perf_counter() - started:.1f} s")
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    # python backtest.py --days 365 --backend onnx
+    sys.exit(main())
@@ -0,0 +1,87 @@
+import argparse
+import json
+import sys
+import time
+
+import jwt
+from flask import Flask, jsonify, request
+
+import auth
+
+SECRET = 'bench-secret-key-for-hs256-signing-only'
+
+
+def per_call_us(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def legacy_check(header):
+    """The old token_required body: decode on every request."""
+    token = header[7:] if header.startswith('Bearer ') else header
+    return jwt.decode(token, SECRET, algorithms=['HS256'])['username']
+
+
+def route_client(check):
+    """A Flask app with one authenticated no-op route, protected by `check`."""
+    app = Flask(__name__)
+
+    @app.route('/ping')
+    def ping():
+        try:
+            user = check(request.headers.get('Authorization'))
+        except (jwt.InvalidTokenError, auth.AuthError):
+            return jsonify({'message': 'Token is invalid!'}), 401
+        return jsonify({'user': user})
+
+    return app.test_client()
+
+
+def run(iterations, users):
+    verifier = auth.TokenVerifier({'default': SECRET})
+    headers = [f"Bearer {verifier.issue(f'user{i}')}" for i in range(users)]
+    ring = iter(range(1 << 62))
+
+    def next_header():
+        return headers[next(ring) % users]
+
+    results = {
+        "decode_us": per_call_us(lambda: legacy_check(next_header()), iterations),
+        "cached_verify_us": per_call_us(lambda: verifier.verify_header(next_header()), iterations),
+    }
+    uncached = auth.TokenVerifier({'default': SECRET}, cache_size=0)
+    results["uncached_verify_us"] = per_call_us(lambda: uncached.verify_header(next_header()), iterations)
+
+    # Whole request through Flask, to put the auth share of a request in context.
+    for name, check in (("route_decode_us", legacy_check), ("route_cached_us", verifier.verify_header)):
+        client = route_client(check)
+        results[name] = per_call_us(lambda: client.get('/ping', headers={'Authorization': next_header()}),
+                                    max(1, iterations // 10))
+    results["verifier"] = verifier.stats()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-request JWT verification cost, before and after caching.")
+    parser.add_argument('--iterations', type=int, default=50000)
+    parser.add_argument('--users', type=int, default=1000, help="distinct tokens cycled through")
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args(argv)
+
+    results = run(args.iterations, args.users)
+    print(f"jwt.decode per request     {results['decode_us']:8.2f} us")
+    print(f"TokenVerifier (cache miss) {results['uncached_verify_us']:8.2f} us")
+    print(f"TokenVerifier (cache hit)  {results['cached_verify_us']:8.2f} us")
+    print(f"Flask route, decode        {results['route_decode_us']:8.2f} us")
+    print(f"Flask route, cached        {results['route_cached_us']:8.2f} us")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    # python -m bench.auth_bench
+    sys.exit(main())
@@ -0,0 +1,173 @@
+import glob
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Recorded payloads live here as {hours,days,tick}_{INSTRUMENT}.json; anything not recorded
+# is synthesized deterministically so runs are reproducible without network access.
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+INTERVALS = {'hours': 3600, 'days': 86400}
+BASE_PRICES_INR = {
+    'BTC': 5_600_000.0, 'ETH': 285_000.0, 'BNB': 53_000.0, 'SOL': 16_500.0, 'ADA': 90.0,
+    'AVAX': 3_500.0, 'LINK': 2_150.0, 'MATIC': 80.0, 'DOT': 700.0, 'UNI': 1_050.0,
+    'ETC': 2_300.0, 'LTC': 7_200.0, 'USDT': 83.5, 'XMR': 14_000.0,
+}
+
+
+def _synthetic_candle(instrument, unit, ts):
+    symbol = instrument.split('-')[0]
+    base = BASE_PRICES_INR.get(symbol, 1_000.0)
+    rng = random.Random(f"{instrument}:{unit}:{ts}")
+    drift = 0.05 * math.sin(ts / 86400 / 7) + 0.01 * math.sin(ts / 3600 / 5)
+    open_ = base * (1 + drift + rng.uniform(-0.005, 0.005))
+    close = open_ * (1 + rng.uniform(-0.01, 0.01))
+    high = max(open_, close) * (1 + rng.uniform(0, 0.005))
+    low = min(open_, close) * (1 - rng.uniform(0, 0.005))
+    volume = rng.uniform(50, 500) * (24 if unit == 'days' else 1)
+    return {
+        "UNIT": "HOUR" if unit == 'hours' else "DAY", "TIMESTAMP": ts, "TYPE": "267",
+        "MARKET": "cadli", "INSTRUMENT": instrument,
+        "OPEN": open_, "HIGH": high, "LOW": low, "CLOSE": close,
+        "FIRST_MESSAGE_TIMESTAMP": ts, "LAST_MESSAGE_TIMESTAMP": ts + INTERVALS[unit] - 1,
+        "FIRST_MESSAGE_VALUE": open_, "HIGH_MESSAGE_VALUE": high, "LOW_MESSAGE_VALUE": low,
+        "LAST_MESSAGE_VALUE": close, "TOTAL_INDEX_UPDATES": rng.randint(1000, 5000),
+        "VOLUME": volume, "QUOTE_VOLUME": volume * close,
+        "VOLUME_TOP_TIER": volume * 0.8, "QUOTE_VOLUME_TOP_TIER": volume * close * 0.8,
+        "VOLUME_DIRECT": volume * 0.1, "QUOTE_VOLUME_DIRECT": volume * close * 0.1,
+    }
+
+
+def _synthetic_tick(instrument, now):
+    hour = int(now) // 3600 * 3600
+    current = _synthetic_candle(instrument, 'hours', hour)
+    day_ago = _synthetic_candle(instrument, 'hours', hour - 86400)
+    change = current["CLOSE"] - day_ago["OPEN"]
+    return {
+        "TYPE": "1101", "MARKET": "cadli", "INSTRUMENT": instrument,
+        "VALUE": current["CLOSE"], "VALUE_LAST_UPDATE_TS": int(now),
+        "MOVING_24_HOUR_OPEN": day_ago["OPEN"], "MOVING_24_HOUR_HIGH": current["HIGH"] * 1.01,
+        "MOVING_24_HOUR_LOW": current["LOW"] * 0.99, "MOVING_24_HOUR_VOLUME": current["VOLUME"] * 24,
+        "MOVING_24_HOUR_QUOTE_VOLUME": current["QUOTE_VOLUME"] * 24,
+        "MOVING_24_HOUR_CHANGE": change,
+        "MOVING_24_HOUR_CHANGE_PERCENTAGE": change / day_ago["OPEN"] * 100,
+    }
+
+
+class FakeCoinDesk:
+    """Serves recorded or synthetic CoinDesk `historical/{hours,days}` and `latest/tick` payloads."""
+
+    def __init__(self, fixtures_dir=FIXTURES_DIR, clock=None):
+        self.clock = clock
+        self.recorded = {}
+        for path in glob.glob(os.path.join(fixtures_dir, '*.json')):
+            endpoint, instrument = os.path.basename(path)[:-len('.json')].split('_', 1)
+            with open(path) as f:
+                self.recorded[(endpoint, instrument)] = json.load(f)
+        self.requests = 0
+
+    def now(self):
+        return self.clock() if self.clock else time.time()
+
+    def historical(self, unit, params):
+        instrument = params.get('instrument', 'BTC-INR')
+        limit = min(int(params.get('limit', 30)), 2000)
+        interval = INTERVALS[unit]
+        to_ts = int(params.get('to_ts', self.now()))
+        recorded = self.recorded.get((unit, instrument))
+        if recorded is not None:
+            rows = [row for row in recorded['Data'] if row['TIMESTAMP'] <= to_ts][-limit:]
+            return {"Data": rows, "Err": {}}
+        last = to_ts // interval * interval
+        if 'start_ts' in params:
+            start = int(params['start_ts']) // interval * interval
+            timestamps = range(start, last + 1, interval)
+        else:
+            timestamps = range(last - (limit - 1) * interval, last + 1, interval)
+        return {"Data": [_synthetic_candle(instrument, unit, ts) for ts in timestamps], "Err": {}}
+
+    def tick(self, params):
+        instruments = [i for i in params.get('instruments', '').split(',') if i]
+        now = self.now()
+        data = {}
+        for instrument in instruments:
+            recorded = self.recorded.get(('tick', instrument))
+            data[instrument] = recorded if recorded is not None else _synthetic_tick(instrument, now)
+        return {"Data": data, "Err": {}}
+
+    def handle(self, path, params):
+        self.requests += 1
+        if path.endswith('/historical/hours'):
+            return self.historical('hours', params)
+        if path.endswith('/historical/days'):
+            return self.historical('days', params)
+        if path.endswith('/latest/tick'):
+            return self.tick(params)
+        return None
+
+
+def serve(fake=None, host='127.0.0.1', port=0):
+    """Starts the stand-in server on a daemon thread. Returns (server, base_url)."""
+    fake = fake or FakeCoinDesk()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body go out in separate writes; without this, delayed ACKs add ~40 ms.
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            payload = fake.handle(url.path, params)
+            body = json.dumps(payload if payload is not None else {"Err": {"message": "not found"}}).encode()
+            self.send_response(200 if payload is not None else 404)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.fake = fake
+    threading.Thread(target=server.serve_forever, name='fake-coindesk', daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def record(symbols, fixtures_dir=FIXTURES_DIR):
+    """Captures real CoinDesk payloads as fixtures (needs COINDESK_API_KEY)."""
+    import upstream
+
+    os.makedirs(fixtures_dir, exist_ok=True)
+    client = upstream.get_client()
+    for symbol in symbols:
+        instrument = f"{symbol}-INR"
+        for unit, limit in (('hours', 2000), ('days', 2000)):
+            payload = client.get_json(f"/index/cc/v1/historical/{unit}", {
+                'market': 'cadli', 'instrument': instrument, 'limit': limit, 'aggregate': 1,
+                'fill': 'true', 'apply_mapping': 'true', 'response_format': 'JSON'})
+            with open(os.path.join(fixtures_dir, f"{unit}_{instrument}.json"), 'w') as f:
+                json.dump(payload, f)
+        payload = client.get_json("/index/cc/v1/latest/tick", {
+            'market': 'cadli', 'instruments': instrument, 'apply_mapping': 'true'})
+        with open(os.path.join(fixtures_dir, f"tick_{instrument}.json"), 'w') as f:
+            json.dump(payload['Data'][instrument], f)
+        print(f"Recorded {instrument}")
+
+
+if __name__ == '__main__':
+    # python -m bench.fake_coindesk [--record SYM,SYM] [--port N]
+    if '--record' in sys.argv:
+        record(sys.argv[sys.argv.index('--record') + 1].split(','))
+    else:
+        port = int(sys.argv[sys.argv.index('--port') + 1]) if '--port' in sys.argv else 8765
+        server, url = serve(port=port)
+        print(f"Fake CoinDesk listening on {url} (set COINDESK_BASE_URL={url})")
+        threading.Event().wait()
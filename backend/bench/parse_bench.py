@@ -0,0 +1,97 @@
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+import ohlcv_parser
+from bench.fake_coindesk import _synthetic_candle
+
+COLUMNS = ['price_open', 'price_high', 'price_low', 'price_close', 'volume']
+START_TS = 1_700_000_000 // 3600 * 3600
+
+
+def per_call_us(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def response_body(rows):
+    """A CoinDesk historical/hours body with every field the real API returns."""
+    candles = [_synthetic_candle('BTC-INR', 'hours', START_TS + i * 3600) for i in range(rows)]
+    return json.dumps({"Data": candles, "Err": {}}).encode()
+
+
+def legacy_parse(body):
+    """The old fetch_candles_from_api body: decode, then convert candle by candle."""
+    rows = []
+    for candle in json.loads(body)['Data']:
+        rows.append((int(candle['TIMESTAMP']),) + tuple(float(candle[f]) for f in ohlcv_parser.CANDLE_FIELDS))
+    rows.sort()
+    return rows
+
+
+def legacy_window(rows):
+    """The old get_latest_data_from_api + _forecast_from_windows: DataFrame, slice, float32."""
+    import pandas as pd
+
+    df = pd.DataFrame.from_records(rows, columns=['TIMESTAMP'] + COLUMNS, index='TIMESTAMP')
+    window = df[COLUMNS].iloc[-len(rows):]
+    return int(window.index[-1]), np.asarray(window, dtype=np.float32)
+
+
+def array_window(rows):
+    """CandleStore.window_arrays on the same stored rows."""
+    table = np.array(rows, dtype=np.float64).reshape(len(rows), 6)
+    return table[:, 0].astype(np.int64), table[:, 1:].astype(np.float32)
+
+
+def run(iterations, rows):
+    body = response_body(rows)
+    stored = legacy_parse(body)
+    results = {
+        "rows": rows,
+        "body_bytes": len(body),
+        "legacy_parse_us": per_call_us(lambda: legacy_parse(body), iterations),
+        "parse_us": per_call_us(lambda: ohlcv_parser.parse_candles(body), iterations),
+        "array_window_us": per_call_us(lambda: array_window(stored), iterations),
+        "orjson": ohlcv_parser.orjson is not None,
+    }
+    try:
+        results["legacy_window_us"] = per_call_us(lambda: legacy_window(stored), iterations)
+    except ImportError:
+        results["legacy_window_us"] = None  # pandas is no longer a dependency
+
+    timestamps, values = ohlcv_parser.parse_candles(body)
+    expected = np.array(stored, dtype=np.float64)
+    assert np.array_equal(timestamps, expected[:, 0].astype(np.int64))
+    assert np.allclose(values, expected[:, 1:], rtol=1e-6)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-window cost of parsing CoinDesk candles, before and after.")
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--rows', type=int, default=168, help="candles per response (168 = one hourly window)")
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args(argv)
+
+    results = run(args.iterations, args.rows)
+    print(f"{results['rows']} candles, {results['body_bytes']} byte response")
+    print(f"response, json + dict loop  {results['legacy_parse_us']:8.1f} us")
+    print(f"response, ohlcv_parser      {results['parse_us']:8.1f} us")
+    if results['legacy_window_us'] is not None:
+        print(f"window, pandas DataFrame    {results['legacy_window_us']:8.1f} us")
+    print(f"window, NumPy arrays        {results['array_window_us']:8.1f} us")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    # python -m bench.parse_bench
+    sys.exit(main())
@@ -0,0 +1,277 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from bench.fake_coindesk import serve
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+CONCURRENCY_LEVELS = (1, 4, 16, 64)
+
+
+def summarize(samples_ms):
+    samples = np.asarray(samples_ms, dtype=np.float64)
+    return {
+        "n": int(samples.size),
+        "mean_ms": float(samples.mean()),
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p95_ms": float(np.percentile(samples, 95)),
+        "p99_ms": float(np.percentile(samples, 99)),
+    }
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - start) * 1000.0, result
+
+
+def load_test(fn, concurrency, duration):
+    """Calls `fn` from `concurrency` threads for `duration` seconds; returns latency summary and req/s."""
+    samples, errors = [], [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        local = []
+        while time.perf_counter() < deadline:
+            elapsed, ok = timed(fn)
+            local.append(elapsed)
+            if not ok:
+                with lock:
+                    errors[0] += 1
+        with lock:
+            samples.extend(local)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    wall = time.perf_counter() - started
+    result = summarize(samples)
+    result["rps"] = len(samples) / wall
+    result["errors"] = errors[0]
+    return result
+
+
+# --- Scenarios ---
+# -----------------------------------------------------------------------------
+def fresh_candle_store():
+    import candle_store
+
+    candle_store._store = candle_store.CandleStore(os.path.join(tempfile.mkdtemp(prefix='bench-'), 'candles.sqlite'))
+
+
+def fresh_prediction_store():
+    # Bench predictions must not land in (and be scored into) the real prediction history.
+    import prediction_store
+
+    prediction_store._store = prediction_store.PredictionStore(
+        os.path.join(tempfile.mkdtemp(prefix='bench-'), 'predictions.sqlite'))
+
+
+def bench_predictions(pairs, iterations, backend=None):
+    import prediction_engine
+    from forecast_cache import forecast_cache
+    from model_registry import registry
+
+    results = {}
+    for coin_symbol, frequency in pairs:
+        registry.invalidate()
+        forecast_cache.invalidate()
+        fresh_candle_store()
+        cold_ms, cold = timed(lambda: prediction_engine.predict_values(coin_symbol, frequency, 1, backend))
+        if 'error' in cold:
+            results[f"{coin_symbol}/{frequency}"] = {"error": cold['error']}
+            continue
+
+        warm = []
+        for _ in range(iterations):
+            # Drop only the forecast so each call pays candle sync + inference, not model loading.
+            forecast_cache.invalidate(coin_symbol, frequency)
+            warm.append(timed(lambda: prediction_engine.predict_values(coin_symbol, frequency, 1, backend))[0])
+        cached = [timed(lambda: prediction_engine.predict_values(coin_symbol, frequency, 1, backend))[0]
+                  for _ in range(iterations)]
+        results[f"{coin_symbol}/{frequency}"] = {
+            "cold_ms": cold_ms,
+            "warm": summarize(warm),
+            "cached": summarize(cached),
+        }
+        print(f"  predict {coin_symbol}/{frequency}: cold {cold_ms:.0f} ms, "
+              f"warm p50 {results[f'{coin_symbol}/{frequency}']['warm']['p50_ms']:.1f} ms")
+    return results
+
+
+def memory_response_cache():
+    # Fake-CoinDesk responses must never reach the shared on-disk tier a real server reads.
+    import response_cache
+
+    response_cache._cache = response_cache.ResponseCache(disk_path=None)
+
+
+def bench_api_client(symbols, duration, levels):
+    import api_client
+
+    def uncached(f):
+        return getattr(f, 'uncached', f)
+
+    scenarios = {
+        # Every call goes upstream (or to the candle store); cache hits are measured separately.
+        "fetch_coin_24h_change": lambda: "error" not in uncached(api_client.fetch_coin_24h_change)(symbols[0]),
+        "fetch_multiple_coins_24h_change": lambda: isinstance(
+            uncached(api_client.fetch_multiple_coins_24h_change)(symbols), list),
+        "fetch_coin_history": lambda: isinstance(uncached(api_client.fetch_coin_history)(symbols[0], 30), list),
+        "fetch_coin_24h_change (cached)": lambda: "error" not in api_client.fetch_coin_24h_change(symbols[0]),
+    }
+    results = {}
+    for name, fn in scenarios.items():
+        for concurrency in levels:
+            results[f"{name}@{concurrency}"] = load_test(fn, concurrency, duration)
+            print(f"  {name} @ {concurrency}: {results[f'{name}@{concurrency}']['rps']:.0f} req/s")
+    return results
+
+
+def bench_routes(duration, levels):
+    import requests
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    import app as flask_app
+
+    fresh_prediction_store()
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server('127.0.0.1', 0, flask_app.app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    token = requests.post(f"{base}/api/auth/login", json={"username": "bench", "password": "bench"}).json()["token"]
+    local = threading.local()
+
+    def session():
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+            local.session.headers['Authorization'] = f"Bearer {token}"
+        return local.session
+
+    scenarios = {
+        "GET /api/coins": lambda: session().get(f"{base}/api/coins").status_code == 200,
+        "POST /api/prediction": lambda: session().post(f"{base}/api/prediction", json={
+            "coin": "bitcoin", "timeframe": "hourly", "units": 6}).status_code == 200,
+    }
+    results = {}
+    try:
+        for name, fn in scenarios.items():
+            fn()  # warm up models, caches and connections
+            for concurrency in levels:
+                results[f"{name}@{concurrency}"] = load_test(fn, concurrency, duration)
+                print(f"  {name} @ {concurrency}: {results[f'{name}@{concurrency}']['rps']:.0f} req/s, "
+                      f"p99 {results[f'{name}@{concurrency}']['p99_ms']:.1f} ms")
+    finally:
+        server.shutdown()
+    return results
+
+
+# --- Baseline comparison ---
+# -----------------------------------------------------------------------------
+def flatten(results, prefix=''):
+    """Flattens nested results into {'a.b.p99_ms': value}, keeping only comparable metrics."""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif key.endswith('_ms') or key == 'rps':
+            flat[name] = value
+    return flat
+
+
+def compare(results, baseline, tolerance):
+    """Returns a list of human-readable regressions beyond `tolerance` (fractional)."""
+    current, previous = flatten(results), flatten(baseline)
+    regressions = []
+    for name, old in previous.items():
+        new = current.get(name)
+        if new is None or not old:
+            continue
+        if name.endswith('rps'):
+            worse = new < old * (1 - tolerance)
+        else:
+            worse = new > old * (1 + tolerance)
+        if worse:
+            regressions.append(f"{name}: {old:.2f} -> {new:.2f}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark prediction and market-data hot paths against a fake CoinDesk.")
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help="write the results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed fractional regression (default 0.25)")
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=3.0, help="seconds per throughput scenario")
+    parser.add_argument('--backend', default=None, help="prediction backend: keras or onnx")
+    parser.add_argument('--only', default='predict,api_client,routes')
+    parser.add_argument('--quick', action='store_true', help="BTC/hourly only, concurrency 1 and 16")
+    args = parser.parse_args(argv)
+
+    server, base_url = serve()
+    import upstream
+    upstream.set_client(upstream.UpstreamClient(base_url=base_url, api_key='bench'))
+    fresh_candle_store()
+    memory_response_cache()
+
+    import prediction_engine
+    pairs = [('BTC', 'hourly')] if args.quick else prediction_engine.available_models()
+    levels = (1, 16) if args.quick else CONCURRENCY_LEVELS
+    only = set(args.only.split(','))
+
+    results = {"meta": {"timestamp": time.time(), "backend": args.backend or prediction_engine.resolve_backend(),
+                        "python": sys.version.split()[0], "cpus": os.cpu_count()}}
+    if 'predict' in only:
+        print("predict_values:")
+        results["predict"] = bench_predictions(pairs, args.iterations, args.backend)
+    if 'api_client' in only:
+        print("api_client:")
+        results["api_client"] = bench_api_client(['BTC', 'ETH', 'SOL'], args.duration, levels)
+    if 'routes' in only:
+        print("Flask routes:")
+        results["routes"] = bench_routes(args.duration, levels)
+    results["meta"]["upstream_requests"] = server.fake.requests
+    server.shutdown()
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return 0
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    if regressions:
+        print(f"\nPERFORMANCE REGRESSIONS (> {args.tolerance:.0%} worse than baseline):")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("No regressions against baseline.")
+    return 0
+
+
+if __name__ == '__main__':
+    # Run from backend/: python -m bench.run [--quick] [--save-baseline]
+    sys.exit(main())
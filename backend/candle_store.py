@@ -0,0 +1,264 @@
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+import metrics
+import ohlcv_parser
+import upstream
+
+# --- Configuration ---
+# -----------------------------------------------------------------------------
+HISTORICAL_PATH = "/index/cc/v1/historical/{endpoint}"
+STORE_PATH = os.getenv("CANDLE_STORE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'candles.sqlite'))
+# Serve stored candles during an upstream outage as long as the newest one is at most this many candles old.
+MAX_STALE_CANDLES = int(os.getenv("CANDLE_STORE_MAX_STALE", "3"))
+# CoinDesk caps `limit` per historical request.
+MAX_FETCH_LIMIT = 2000
+
+GRANULARITY_SECONDS = {'hour': 3600, 'day': 86400}
+GRANULARITY_ENDPOINTS = {'hour': 'hours', 'day': 'days'}
+CANDLE_FIELDS = ohlcv_parser.CANDLE_FIELDS
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS candles (
+    instrument TEXT NOT NULL,
+    granularity TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    open REAL NOT NULL,
+    high REAL NOT NULL,
+    low REAL NOT NULL,
+    close REAL NOT NULL,
+    volume REAL NOT NULL,
+    PRIMARY KEY (instrument, granularity, ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS coverage (
+    instrument TEXT NOT NULL,
+    granularity TEXT NOT NULL,
+    covered_from INTEGER NOT NULL,
+    PRIMARY KEY (instrument, granularity)
+) WITHOUT ROWID;
+"""
+
+
+class CandleFetchError(Exception):
+    """Raised when candles could not be fetched and the store cannot cover the request."""
+
+
+def fetch_candles_from_api(instrument, granularity, limit, to_ts=None):
+    """
+    Fetches up to `limit` candles ending at `to_ts` from the CoinDesk historical endpoint.
+    Returns a list of (ts, open, high, low, close, volume) tuples in ascending time order.
+    """
+    client = upstream.get_client()
+    if not client.api_key:
+        raise CandleFetchError("COINDESK_API_KEY not found. Please set it in your .env file.")
+
+    params = {
+        'market': 'cadli', 'instrument': instrument, 'limit': min(limit, MAX_FETCH_LIMIT),
+        'aggregate': 1, 'fill': 'true', 'apply_mapping': 'true',
+        'response_format': 'JSON', 'to_ts': int(to_ts or time.time())
+    }
+    path = HISTORICAL_PATH.format(endpoint=GRANULARITY_ENDPOINTS[granularity])
+
+    try:
+        body = client.get(path, params)
+    except upstream.UpstreamError as e:
+        raise CandleFetchError(str(e))
+
+    try:
+        # The store keeps full precision; inference windows are read back as float32.
+        timestamps, values = ohlcv_parser.parse_candles(body, CANDLE_FIELDS, dtype=np.float64)
+    except ohlcv_parser.OHLCVParseError as e:
+        raise CandleFetchError(str(e))
+
+    # Gaps are stored as they are: refusing them would re-fetch the same hole forever.
+    # Inference windows are checked for contiguity when they are read back.
+    gaps = ohlcv_parser.find_gaps(timestamps, GRANULARITY_SECONDS[granularity])
+    if gaps:
+        missing = sum(count for _, count in gaps)
+        metrics.CANDLE_GAPS.inc(granularity, amount=missing)
+        print(f"Warning: {instrument} {granularity} response skips {missing} candle(s) "
+              f"in {len(gaps)} gap(s), first after {gaps[0][0]}.")
+    return list(zip(timestamps.tolist(), *values.T.tolist()))
+
+
+class CandleStore:
+    """
+    Local OHLCV store per (instrument, granularity), backed by SQLite in WAL mode.
+
+    Reads go through `get_window`/`get_range`, which first sync the store by fetching only
+    candles newer than the last stored one (plus that one, since it may still have been open).
+    """
+
+    def __init__(self, path=STORE_PATH, fetcher=fetch_candles_from_api):
+        self.path = path
+        self.fetcher = fetcher
+        self._local = threading.local()
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._conn() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _lock(self, instrument, granularity):
+        with self._locks_guard:
+            return self._locks.setdefault((instrument, granularity), threading.Lock())
+
+    # --- Raw access ---
+    def bounds(self, instrument, granularity):
+        """Returns (first_ts, last_ts) of stored candles, or (None, None)."""
+        return self._conn().execute(
+            "SELECT MIN(ts), MAX(ts) FROM candles WHERE instrument = ? AND granularity = ?",
+            (instrument, granularity)).fetchone()
+
+    def covered_from(self, instrument, granularity):
+        row = self._conn().execute(
+            "SELECT covered_from FROM coverage WHERE instrument = ? AND granularity = ?",
+            (instrument, granularity)).fetchone()
+        return row[0] if row else None
+
+    def upsert(self, instrument, granularity, rows, covered_from=None, reset_coverage=False):
+        """
+        Stores `rows`. `covered_from` extends the contiguous coverage back to that candle; it
+        is only merged with the old coverage (MIN) when `rows` join onto it, otherwise pass
+        `reset_coverage` so coverage restarts at `covered_from`.
+        """
+        merge = "excluded.covered_from" if reset_coverage else "MIN(covered_from, excluded.covered_from)"
+        with self._conn() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                ((instrument, granularity) + tuple(row) for row in rows))
+            if covered_from is not None:
+                conn.execute(
+                    "INSERT INTO coverage VALUES (?, ?, ?) ON CONFLICT(instrument, granularity) "
+                    f"DO UPDATE SET covered_from = {merge}",
+                    (instrument, granularity, covered_from))
+
+    def window(self, instrument, granularity, limit):
+        """Returns the newest `limit` stored candles in ascending time order."""
+        rows = self._conn().execute(
+            "SELECT ts, open, high, low, close, volume FROM candles "
+            "WHERE instrument = ? AND granularity = ? ORDER BY ts DESC LIMIT ?",
+            (instrument, granularity, limit)).fetchall()
+        rows.reverse()
+        return rows
+
+    def window_arrays(self, instrument, granularity, limit):
+        """Like `window`, as (int64 timestamps, float32 (n, 5) OHLCV values) arrays."""
+        rows = self.window(instrument, granularity, limit)
+        table = np.array(rows, dtype=np.float64).reshape(len(rows), len(CANDLE_FIELDS) + 1)
+        return table[:, 0].astype(np.int64), table[:, 1:].astype(np.float32)
+
+    def range(self, instrument, granularity, start_ts, end_ts):
+        """Returns stored candles with start_ts <= ts <= end_ts in ascending time order."""
+        return self._conn().execute(
+            "SELECT ts, open, high, low, close, volume FROM candles "
+            "WHERE instrument = ? AND granularity = ? AND ts BETWEEN ? AND ? ORDER BY ts",
+            (instrument, granularity, start_ts, end_ts)).fetchall()
+
+    # --- Incremental sync ---
+    def sync(self, instrument, granularity, limit):
+        """
+        Makes sure the newest `limit` candles are stored, fetching as few as possible.
+        During an upstream outage recent stored data is kept and a warning printed;
+        raises CandleFetchError only if the stored data is too old or missing.
+        """
+        interval = GRANULARITY_SECONDS[granularity]
+        now = time.time()
+        current_ts = int(now) // interval * interval
+        wanted_from = current_ts - (limit - 1) * interval
+
+        with self._lock(instrument, granularity):
+            first_ts, last_ts = self.bounds(instrument, granularity)
+            covered_from = self.covered_from(instrument, granularity)
+            has_history = covered_from is not None and covered_from <= wanted_from
+
+            if last_ts is not None and has_history:
+                # Re-fetch the last stored candle too, it may have been in progress.
+                missing = (current_ts - last_ts) // interval + 1
+                fetch_limit = min(limit, missing)
+            else:
+                fetch_limit = limit
+
+            try:
+                rows = self.fetcher(instrument, granularity, fetch_limit, now)
+            except CandleFetchError as e:
+                if last_ts is not None and current_ts - last_ts <= MAX_STALE_CANDLES * interval:
+                    print(f"Warning: {e}; serving stored {instrument} {granularity} candles.")
+                    return
+                raise
+
+            covered = wanted_from if fetch_limit == limit else None
+            # A full window fetched after a long outage leaves a hole after the stored candles;
+            # older coverage no longer joins on, so it restarts at this window (backfill pages
+            # back over the hole when asked for older candles).
+            contiguous = last_ts is not None and last_ts + interval >= wanted_from
+            self.upsert(instrument, granularity, rows, covered_from=covered, reset_coverage=not contiguous)
+
+    def get_window(self, instrument, granularity, limit):
+        """Syncs, then returns the newest `limit` candles as (ts, o, h, l, c, v) tuples."""
+        self.sync(instrument, granularity, limit)
+        return self.window(instrument, granularity, limit)
+
+    def get_window_arrays(self, instrument, granularity, limit):
+        """Syncs, then returns the newest `limit` candles as (timestamps, values) arrays."""
+        self.sync(instrument, granularity, limit)
+        return self.window_arrays(instrument, granularity, limit)
+
+    def get_range(self, instrument, granularity, start_ts, end_ts=None):
+        """Syncs enough history to cover `start_ts`, then returns candles in the range."""
+        interval = GRANULARITY_SECONDS[granularity]
+        end_ts = int(end_ts or time.time())
+        limit = (end_ts - int(start_ts)) // interval + 1
+        if limit > MAX_FETCH_LIMIT:
+            raise CandleFetchError(f"Range too long: at most {MAX_FETCH_LIMIT} candles per request.")
+        self.sync(instrument, granularity, limit)
+        return self.range(instrument, granularity, int(start_ts), end_ts)
+
+    def backfill(self, instrument, granularity, start_ts, end_ts=None):
+        """
+        Makes sure every candle from `start_ts` to `end_ts` is stored, paging backwards in
+        MAX_FETCH_LIMIT-candle requests from the oldest stored candle, then returns them.
+        Used for long histories (e.g. backtests) that `get_range` refuses to fetch at once.
+        """
+        interval = GRANULARITY_SECONDS[granularity]
+        end_ts = int(end_ts or time.time())
+        start_ts = int(start_ts) // interval * interval
+        self.sync(instrument, granularity, min(MAX_FETCH_LIMIT, (end_ts - start_ts) // interval + 1))
+
+        with self._lock(instrument, granularity):
+            oldest = self.covered_from(instrument, granularity)
+            while oldest is not None and oldest > start_ts:
+                limit = min(MAX_FETCH_LIMIT, (oldest - start_ts) // interval)
+                rows = self.fetcher(instrument, granularity, limit, oldest - interval)
+                if not rows or rows[0][0] >= oldest:
+                    break  # nothing older upstream (e.g. before the instrument was listed)
+                self.upsert(instrument, granularity, rows, covered_from=rows[0][0])
+                oldest = rows[0][0]
+        return self.range(instrument, granularity, start_ts, end_ts)
+
+
+_store = None
+_store_guard = threading.Lock()
+
+
+def get_store():
+    """Returns the shared CandleStore, opening it on first use."""
+    global _store
+    if _store is None:
+        with _store_guard:
+            if _store is None:
+                _store = CandleStore()
+    return _store
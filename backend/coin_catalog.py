@@ -0,0 +1,158 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+import model_bundle
+from inference_runtime import BACKENDS, MODEL_EXTENSIONS
+from model_bundle import FREQUENCY_SUBDIRS, MODEL_BASE_DIR
+from numpy_scaler import sidecar_path
+
+# --- Configuration ---
+# -----------------------------------------------------------------------------
+QUOTE_CURRENCY = 'INR'
+FREQUENCIES = tuple(FREQUENCY_SUBDIRS)
+
+
+def _scan_artifacts(model_dir):
+    """
+    Lists every artifact file once: {(symbol, frequency, backend): (model_path, scaler_path)}
+    for the file-based backends, plus the bundled (symbol, frequency) keys.
+    """
+    found = {}
+    for frequency, subdir in FREQUENCY_SUBDIRS.items():
+        directory = os.path.join(model_dir, subdir)
+        try:
+            with os.scandir(directory) as it:
+                names = {entry.name for entry in it if entry.is_file()}
+        except FileNotFoundError:
+            continue
+        for backend, extension in MODEL_EXTENSIONS.items():
+            suffix = f'_model{extension}'
+            for name in names:
+                if not name.endswith(suffix):
+                    continue
+                symbol = name[:-len(suffix)]
+                scaler = f'{symbol}_scaler.pkl'
+                # Prefer the NumPy sidecar written by `python numpy_scaler.py`; it avoids importing sklearn.
+                if os.path.basename(sidecar_path(scaler)) in names:
+                    scaler = os.path.basename(sidecar_path(scaler))
+                elif scaler not in names:
+                    continue
+                found[(symbol, frequency, backend)] = (os.path.join(directory, name), os.path.join(directory, scaler))
+
+    bundled = set()
+    if os.path.exists(model_bundle.BUNDLE_PATH):
+        try:
+            bundled = {tuple(key.split('/')) for key in model_bundle.open_bundle().keys()}
+        except (OSError, model_bundle.BundleFormatError) as e:
+            print(f"Ignoring unreadable model bundle: {e}")
+    return found, bundled
+
+
+class CoinCatalog:
+    """
+    Immutable, array-backed index of every supported coin.
+
+    Row i of the parallel tuples describes one coin: its frontend id, symbol, CoinDesk
+    instrument and market metadata. `available[i, f, b]` says whether frequency f has a
+    model under backend b, and `_paths` holds the artifact paths for the same cell, so
+    resolving a coin or its model is a dict lookup plus an array index with no filesystem
+    access. Coins with models but no metadata are included with a lower-cased symbol as id.
+    Built once by `refresh()` and swapped in whole, so readers never see a partial catalog.
+    """
+    __slots__ = ("ids", "symbols", "instruments", "metadata", "available", "_paths",
+                 "_by_id", "_by_symbol", "built_at")
+
+    def __init__(self, coins=(), model_dir=MODEL_BASE_DIR):
+        found, bundled = _scan_artifacts(model_dir)
+        rows = [(coin["id"], coin["symbol"].upper(), coin) for coin in coins]
+        known = {symbol for _, symbol, _ in rows}
+        extra = sorted({symbol for symbol, _, _ in found} | {symbol for symbol, _ in bundled})
+        rows += [(symbol.lower(), symbol, None) for symbol in extra if symbol not in known]
+
+        self.ids = tuple(row[0] for row in rows)
+        self.symbols = tuple(row[1] for row in rows)
+        self.instruments = tuple(f'{symbol}-{QUOTE_CURRENCY}' for symbol in self.symbols)
+        self.metadata = tuple(row[2] for row in rows)
+        self._by_id = {coin_id: i for i, coin_id in enumerate(self.ids)}
+        self._by_symbol = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+        shape = (len(rows), len(FREQUENCIES), len(BACKENDS))
+        self.available = np.zeros(shape, dtype=bool)
+        paths = [None] * int(np.prod(shape))
+        bundle_index = BACKENDS.index('bundle')
+        for i, symbol in enumerate(self.symbols):
+            for f, frequency in enumerate(FREQUENCIES):
+                for b, backend in enumerate(BACKENDS):
+                    if backend == 'bundle':
+                        cell = (model_bundle.BUNDLE_PATH,) if (symbol, frequency) in bundled else None
+                    else:
+                        cell = found.get((symbol, frequency, backend))
+                    if cell is not None:
+                        self.available[i, f, b] = True
+                        paths[(i * len(FREQUENCIES) + f) * len(BACKENDS) + b] = cell
+        self.available.setflags(write=False)
+        self._paths = tuple(paths)
+        self.built_at = time.time()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def row_for_id(self, coin_id):
+        return self._by_id.get(coin_id)
+
+    def row_for_symbol(self, symbol):
+        return self._by_symbol.get(symbol.upper()) if isinstance(symbol, str) else None
+
+    def symbol_for_id(self, coin_id):
+        row = self._by_id.get(coin_id)
+        return None if row is None else self.symbols[row]
+
+    def coin(self, coin_id):
+        """Market metadata for a coin id, or None."""
+        row = self._by_id.get(coin_id)
+        return None if row is None else self.metadata[row]
+
+    def artifact_paths(self, symbol, frequency, backend):
+        """Paths the registry loads for a model (a 2-tuple, or the bundle path), or None."""
+        row = self.row_for_symbol(symbol)
+        if row is None or frequency not in FREQUENCIES or backend not in BACKENDS:
+            return None
+        index = (row * len(FREQUENCIES) + FREQUENCIES.index(frequency)) * len(BACKENDS) + BACKENDS.index(backend)
+        return self._paths[index]
+
+    def has_model(self, symbol, frequency, backend):
+        return self.artifact_paths(symbol, frequency, backend) is not None
+
+    def models(self, backend):
+        """(symbol, frequency) pairs with a model under `backend`, by symbol then frequency."""
+        rows, frequencies = np.nonzero(self.available[:, :, BACKENDS.index(backend)])
+        return sorted((self.symbols[i], FREQUENCIES[f]) for i, f in zip(rows, frequencies))
+
+
+_catalog = None
+_coins = ()
+_catalog_guard = threading.Lock()
+
+
+def get_catalog():
+    """Returns the current catalog, building it on first use."""
+    if _catalog is None:
+        with _catalog_guard:
+            if _catalog is None:
+                return refresh()
+    return _catalog
+
+
+def refresh(coins=None):
+    """
+    Rebuilds the catalog (re-scanning the model directory) and swaps it in atomically.
+    `coins` replaces the market metadata; by default the last metadata given is kept.
+    """
+    global _catalog, _coins
+    if coins is not None:
+        _coins = tuple(dict(coin) for coin in coins)
+    _catalog = CoinCatalog(_coins)
+    return _catalog
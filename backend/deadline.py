@@ -0,0 +1,56 @@
+import contextvars
+import time
+from contextlib import contextmanager
+
+# Absolute time.time() by which the current unit of work (e.g. a prediction job) must finish.
+_deadline = contextvars.ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when the current deadline has passed before a blocking step could finish."""
+
+
+@contextmanager
+def scope(deadline):
+    """Runs the enclosed block under `deadline` (absolute, seconds since the epoch)."""
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining(default=None):
+    """
+    Seconds left before the current deadline, or `default` when none is set.
+    Raises DeadlineExceeded once it has passed.
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return default
+    left = deadline - time.time()
+    if left <= 0:
+        raise DeadlineExceeded("Deadline exceeded")
+    return left
+
+
+def capped(timeout):
+    """`timeout` (seconds, or a (connect, read) tuple) shortened to the time remaining."""
+    left = remaining()
+    if left is None:
+        return timeout
+    if isinstance(timeout, tuple):
+        return tuple(min(t, left) for t in timeout)
+    return left if timeout is None else min(timeout, left)
+
+
+def propagate(fn):
+    """Wraps fn so it runs under the caller's deadline on another thread."""
+    current = _deadline.get()
+    if current is None:
+        return fn
+
+    def wrapper(*args, **kwargs):
+        with scope(current):
+            return fn(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,122 @@
+import threading
+import time
+
+# Seconds per candle for each supported frequency.
+CANDLE_SECONDS = {'hourly': 3600, 'daily': 86400}
+
+
+def next_candle_close(frequency, window_end_ts=None, now=None):
+    """
+    Returns the unix time at which the candle after `window_end_ts` starts, i.e. when
+    a new input window becomes available. Falls back to the next wall-clock boundary
+    when the window end is unknown or already in the past.
+    """
+    interval = CANDLE_SECONDS[frequency]
+    now = time.time() if now is None else now
+    if window_end_ts is not None and window_end_ts + interval > now:
+        return window_end_ts + interval
+    return (int(now) // interval + 1) * interval
+
+
+class ForecastEntry:
+    """
+    Full inverse-transformed forecast horizon produced from one input window.
+    `values` is a (horizon, 5) array of open/high/low/close/volume rows; `bands` holds the
+    sampled forecast quantiles once an uncertainty estimate has been computed for the window.
+    """
+    __slots__ = ("coin_symbol", "frequency", "window_end_ts", "values", "bands", "created_at", "expires_at")
+
+    def __init__(self, coin_symbol, frequency, window_end_ts, values, expires_at):
+        self.coin_symbol = coin_symbol
+        self.frequency = frequency
+        self.window_end_ts = window_end_ts
+        self.values = values
+        self.bands = None
+        self.created_at = time.time()
+        self.expires_at = expires_at
+
+    def is_fresh(self, now=None):
+        return (time.time() if now is None else now) < self.expires_at
+
+    def target_timestamps(self):
+        if self.window_end_ts is None:
+            return None
+        interval = CANDLE_SECONDS[self.frequency]
+        return [self.window_end_ts + interval * (i + 1) for i in range(len(self.values))]
+
+
+class ForecastCache:
+    """
+    Caches full forecast horizons per (symbol, frequency, input-window end timestamp).
+
+    The most recent entry for each (symbol, frequency) is also reachable without knowing
+    the window end, so a fresh forecast can be served without touching the upstream API.
+    Entries expire when the next candle closes.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._current = {}
+        self._lock = threading.Lock()
+        self._listeners = []
+        self.hits = 0
+        self.misses = 0
+
+    def subscribe(self, callback):
+        """Registers callback(entry), called whenever a new forecast is stored."""
+        self._listeners.append(callback)
+
+    def get_current(self, coin_symbol, frequency):
+        """Returns the newest still-fresh entry for a symbol/frequency, or None."""
+        with self._lock:
+            entry = self._current.get((coin_symbol, frequency))
+        if entry is not None and entry.is_fresh():
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def get(self, coin_symbol, frequency, window_end_ts):
+        """Returns the fresh entry computed from exactly this input window, or None."""
+        with self._lock:
+            entry = self._entries.get((coin_symbol, frequency, window_end_ts))
+        if entry is not None and entry.is_fresh():
+            return entry
+        return None
+
+    def put(self, coin_symbol, frequency, window_end_ts, values, expires_at=None):
+        if expires_at is None:
+            expires_at = next_candle_close(frequency, window_end_ts)
+        entry = ForecastEntry(coin_symbol, frequency, window_end_ts, values, expires_at)
+        now = time.time()
+        with self._lock:
+            self._entries[(coin_symbol, frequency, window_end_ts)] = entry
+            current = self._current.get((coin_symbol, frequency))
+            if current is None or window_end_ts is None or current.window_end_ts is None \
+                    or window_end_ts >= current.window_end_ts:
+                self._current[(coin_symbol, frequency)] = entry
+            for key in [k for k, e in self._entries.items() if not e.is_fresh(now)]:
+                del self._entries[key]
+        for callback in list(self._listeners):
+            try:
+                callback(entry)
+            except Exception as e:
+                print(f"Forecast listener failed: {e}")
+        return entry
+
+    def invalidate(self, coin_symbol=None, frequency=None):
+        with self._lock:
+            for key in [k for k in self._entries if (coin_symbol is None or k[0] == coin_symbol)
+                        and (frequency is None or k[1] == frequency)]:
+                del self._entries[key]
+            for key in [k for k in self._current if (coin_symbol is None or k[0] == coin_symbol)
+                        and (frequency is None or k[1] == frequency)]:
+                del self._current[key]
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# Shared instance used by prediction_engine.
+forecast_cache = ForecastCache()
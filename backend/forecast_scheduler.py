@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+
+import metrics
+import prediction_engine
+from forecast_cache import CANDLE_SECONDS, next_candle_close
+
+# --- Configuration ---
+# -----------------------------------------------------------------------------
+ENABLED = os.getenv("FORECAST_SCHEDULER", "1").lower() not in ("0", "false", "no")
+# Seconds after a candle boundary before fetching, giving upstream time to publish it.
+BOUNDARY_DELAY = float(os.getenv("FORECAST_SCHEDULER_DELAY", "5"))
+# Symbols whose newest candle is not published yet are retried this often...
+RETRY_INTERVAL = float(os.getenv("FORECAST_SCHEDULER_RETRY", "15"))
+# ...at most this many times per boundary.
+MAX_RETRIES = int(os.getenv("FORECAST_SCHEDULER_MAX_RETRIES", "8"))
+# Comma-separated symbols to precompute (default: every model on disk).
+SYMBOLS = [s for s in os.getenv("FORECAST_SCHEDULER_SYMBOLS", "").upper().split(",") if s] or None
+
+
+class ForecastScheduler:
+    """
+    Precomputes forecasts just after each candle boundary.
+
+    When an hourly (or daily) candle closes, every input window changes, so the scheduler
+    fetches the newest candles for all configured symbols and runs all models of that
+    frequency in one batched pass, publishing the full horizons to the forecast cache.
+    Requests then find a fresh entry and never wait on upstream or the model. Symbols whose
+    new candle is not published yet are retried until the window catches up.
+    """
+
+    def __init__(self, frequencies=tuple(CANDLE_SECONDS), symbols=SYMBOLS, delay=BOUNDARY_DELAY,
+                 retry_interval=RETRY_INTERVAL, max_retries=MAX_RETRIES,
+                 precompute=prediction_engine.precompute_forecasts):
+        self.frequencies = tuple(frequencies)
+        self.symbols = symbols
+        self.delay = delay
+        self.retry_interval = retry_interval
+        self.max_retries = max_retries
+        self.precompute = precompute
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self.runs = {frequency: {"runs": 0, "last_run": None, "last_seconds": None, "computed": 0,
+                                 "stale": 0, "errors": {}} for frequency in self.frequencies}
+
+    def run_once(self, frequency, now=None):
+        """
+        Precomputes one frequency for the candle that is currently open. Returns the symbols
+        whose forecast still ends before that candle (upstream has not published it yet).
+        """
+        now = time.time() if now is None else now
+        current_ts = int(now) // CANDLE_SECONDS[frequency] * CANDLE_SECONDS[frequency]
+        return self._run(frequency, self.symbols, current_ts)
+
+    def _run(self, frequency, symbols, current_ts):
+        started = time.perf_counter()
+        with metrics.span('precompute'):
+            entries, errors = self.precompute(frequency, symbols)
+        stale = sorted(symbol for (symbol, _), entry in entries.items()
+                       if entry.window_end_ts is not None and entry.window_end_ts < current_ts)
+
+        stats = self.runs[frequency]
+        stats.update(runs=stats["runs"] + 1, last_run=time.time(), last_seconds=time.perf_counter() - started,
+                     computed=len(entries), stale=len(stale),
+                     errors={symbol: error for (symbol, _), error in errors.items()})
+        print(f"Precomputed {len(entries)} {frequency} forecasts in {stats['last_seconds']:.2f} s"
+              f" ({len(stale)} stale, {len(errors)} failed)")
+        return stale
+
+    def _precompute_boundary(self, frequency, boundary):
+        """Runs one frequency for the candle opening at `boundary`, retrying stale symbols."""
+        stale = self._run(frequency, self.symbols, boundary)
+        for _ in range(self.max_retries):
+            if not stale or self._stop.wait(self.retry_interval):
+                return
+            stale = self._run(frequency, stale, boundary)
+        if stale:
+            print(f"Gave up waiting for the {frequency} candle at {boundary} for: {', '.join(stale)}")
+
+    def _loop(self):
+        # Warm the cache right away, then fire shortly after every boundary.
+        due = {frequency: time.time() for frequency in self.frequencies}
+        while not self._stop.is_set():
+            frequency = min(due, key=due.get)
+            if self._stop.wait(max(0.0, due[frequency] - time.time())):
+                return
+            boundary = int(time.time()) // CANDLE_SECONDS[frequency] * CANDLE_SECONDS[frequency]
+            try:
+                self._precompute_boundary(frequency, boundary)
+            except Exception as e:
+                print(f"Forecast precompute failed for {frequency}: {e}")
+            due[frequency] = next_candle_close(frequency) + self.delay
+
+    def ensure_started(self):
+        """Starts the scheduler thread on first use; no-op when disabled."""
+        if not ENABLED or (self._thread is not None and self._thread.is_alive()):
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._loop, name="forecast-scheduler", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+# Shared instance used by app.
+scheduler = ForecastScheduler()
+
+
+def _collect_gauges():
+    return {
+        'crypto_forecast_precompute_seconds': {
+            ('frequency', f): r['last_seconds'] for f, r in scheduler.runs.items() if r['last_seconds'] is not None},
+        'crypto_forecast_precompute_stale': {('frequency', f): r['stale'] for f, r in scheduler.runs.items()},
+    }
+
+
+metrics.register_collector(_collect_gauges)
@@ -0,0 +1,208 @@
+import hashlib
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, InvalidStateError
+
+import numpy as np
+
+# --- Configuration ---
+# -----------------------------------------------------------------------------
+MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH", "32"))
+MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "5"))
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+# Number of recent queue-wait samples kept per model for percentile reporting.
+WAIT_SAMPLES = 1024
+
+
+class _Job:
+    __slots__ = ("model", "inputs", "digest", "future", "enqueued")
+
+    def __init__(self, model, inputs, digest):
+        self.model = model
+        self.inputs = inputs
+        self.digest = digest
+        self.future = Future()
+        self.enqueued = time.monotonic()
+
+
+class _ModelQueue:
+    """Pending jobs and metrics for a single model key, drained by one dispatcher thread."""
+
+    def __init__(self, key):
+        self.key = key
+        self.jobs = []
+        self.in_flight = {}
+        self.cond = threading.Condition()
+        self.thread = None
+        self.batches = 0
+        self.items = 0
+        self.dedup_hits = 0
+        self.size_histogram = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+        self.wait_ms = deque(maxlen=WAIT_SAMPLES)
+        self.max_wait_seen_ms = 0.0
+
+
+def _digest(model, inputs):
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str((id(model), inputs.shape, inputs.dtype.str)).encode())
+    h.update(inputs.tobytes())
+    return h.digest()
+
+
+def _settle(future, result=None, error=None):
+    """Resolves a future unless its caller already cancelled it."""
+    try:
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        pass
+
+
+def _percentile(samples, q):
+    if not samples:
+        return None
+    return float(np.percentile(np.fromiter(samples, dtype=np.float64), q))
+
+
+class InferenceBatcher:
+    """
+    Coalesces concurrent forward passes on the same model into one batched `predict` call.
+
+    Jobs are queued per model key and flushed when `max_batch_size` jobs are waiting or the
+    oldest job has waited `max_wait_ms`. Identical inputs queued or in flight at the same
+    time share one row of the batch. Each caller gets back its own slice of the output.
+    """
+
+    def __init__(self, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self._queues = {}
+        self._lock = threading.Lock()
+
+    def _queue(self, key):
+        with self._lock:
+            queue = self._queues.get(key)
+            if queue is None:
+                queue = self._queues[key] = _ModelQueue(key)
+            if queue.thread is None or not queue.thread.is_alive():
+                # Also replaces a dispatcher that died, so its queued jobs still get served.
+                queue.thread = threading.Thread(
+                    target=self._dispatch, args=(queue,), name=f"inference-{key}", daemon=True)
+                queue.thread.start()
+            return queue
+
+    def submit(self, key, model, inputs):
+        """
+        Queues one input of shape (seq_len, features) for `model`.
+        Returns a Future resolving to that input's row of the model output.
+        """
+        inputs = np.ascontiguousarray(inputs, dtype=np.float32)
+        digest = _digest(model, inputs)
+        queue = self._queue(key)
+        with queue.cond:
+            future = queue.in_flight.get(digest)
+            if future is not None:
+                queue.dedup_hits += 1
+                return future
+            job = _Job(model, inputs, digest)
+            queue.jobs.append(job)
+            queue.in_flight[digest] = job.future
+            queue.cond.notify()
+        return job.future
+
+    def predict(self, key, model, inputs, timeout=None):
+        return self.submit(key, model, inputs).result(timeout)
+
+    def _dispatch(self, queue):
+        while True:
+            with queue.cond:
+                while not queue.jobs:
+                    queue.cond.wait()
+                deadline = queue.jobs[0].enqueued + self.max_wait
+                while len(queue.jobs) < self.max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    queue.cond.wait(remaining)
+                batch = queue.jobs[:self.max_batch_size]
+                del queue.jobs[:self.max_batch_size]
+            try:
+                self._run(queue, batch)
+            except Exception as e:
+                # One bad batch must not take the model's dispatcher down with it.
+                print(f"Inference batch for {queue.key} failed: {e}")
+                for job in batch:
+                    _settle(job.future, error=e)
+
+    def _run(self, queue, batch):
+        started = time.monotonic()
+        # A registry hot-reload can leave jobs for two model objects in one queue.
+        groups = {}
+        for job in batch:
+            groups.setdefault(id(job.model), []).append(job)
+
+        try:
+            for jobs in groups.values():
+                try:
+                    outputs = jobs[0].model.predict(np.stack([job.inputs for job in jobs]), verbose=0)
+                    rows = [outputs[i] for i in range(len(jobs))]
+                except Exception as e:
+                    for job in jobs:
+                        _settle(job.future, error=e)
+                    continue
+                for job, row in zip(jobs, rows):
+                    _settle(job.future, row)
+        finally:
+            self._finish(queue, batch, started)
+
+    def _finish(self, queue, batch, started):
+        with queue.cond:
+            for job in batch:
+                queue.in_flight.pop(job.digest, None)
+            queue.batches += 1
+            queue.items += len(batch)
+            bucket = next((i for i, b in enumerate(BATCH_SIZE_BUCKETS) if len(batch) <= b),
+                          len(BATCH_SIZE_BUCKETS))
+            queue.size_histogram[bucket] += 1
+            for job in batch:
+                waited = (started - job.enqueued) * 1000.0
+                queue.wait_ms.append(waited)
+                if waited > queue.max_wait_seen_ms:
+                    queue.max_wait_seen_ms = waited
+
+    def stats(self):
+        """Per-model queue depth, batch-size and queue-wait metrics."""
+        with self._lock:
+            queues = list(self._queues.values())
+        models = {}
+        for queue in queues:
+            with queue.cond:
+                samples = list(queue.wait_ms)
+                models["/".join(map(str, queue.key))] = {
+                    "queue_depth": len(queue.jobs),
+                    "in_flight": len(queue.in_flight),
+                    "batches": queue.batches,
+                    "items": queue.items,
+                    "dedup_hits": queue.dedup_hits,
+                    "avg_batch_size": queue.items / queue.batches if queue.batches else 0.0,
+                    "batch_size_histogram": {
+                        **{f"le_{b}": n for b, n in zip(BATCH_SIZE_BUCKETS, queue.size_histogram)},
+                        "gt_max": queue.size_histogram[-1],
+                    },
+                    "wait_ms_p50": _percentile(samples, 50),
+                    "wait_ms_p99": _percentile(samples, 99),
+                    "wait_ms_max": queue.max_wait_seen_ms,
+                }
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "models": models,
+        }
+
+
+# Shared instance used by prediction_engine.
+batcher = InferenceBatcher()
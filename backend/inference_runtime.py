@@ -0,0 +1,97 @@
+import os
+
+import numpy as np
+
+# --- Configuration ---
+# -----------------------------------------------------------------------------
+# 'keras' runs the original .h5 models with TensorFlow; 'onnx' runs the exported .onnx
+# files with onnxruntime and never imports TensorFlow; 'bundle' runs every model in NumPy
+# straight from the memory-mapped model/models.bundle (see model_bundle.py).
+DEFAULT_BACKEND = os.getenv("PREDICTION_BACKEND", "keras").lower()
+# Intra-op threads per model session; 0 lets the runtime decide.
+INFERENCE_THREADS = int(os.getenv("INFERENCE_THREADS", "0"))
+BACKENDS = ('keras', 'onnx', 'bundle')
+MODEL_EXTENSIONS = {'keras': '.h5', 'onnx': '.onnx'}
+
+# Set by prepare_for_fork() in a process that will fork workers.
+_prefork_pid = None
+
+
+def prepare_for_fork():
+    """
+    Makes onnxruntime sessions created from now on in this process single-threaded.
+    A session's intra-op thread pool is started with the session and, like any thread,
+    does not survive fork(): a worker running a session inherited with a multi-threaded
+    pool would wait forever on threads that are not there. Models a worker loads itself
+    still get INFERENCE_THREADS.
+    """
+    global _prefork_pid
+    _prefork_pid = os.getpid()
+
+
+class OnnxModel:
+    """
+    onnxruntime session exposing the subset of the Keras model API used by
+    prediction_engine and the inference batcher.
+    """
+
+    def __init__(self, path, threads=INFERENCE_THREADS):
+        import onnxruntime as ort
+
+        if os.getpid() == _prefork_pid:
+            threads = 1
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.path = path
+        self.session = ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_shape = tuple(model_input.shape)
+
+    def predict(self, inputs, verbose=0, batch_size=None):
+        inputs = np.ascontiguousarray(inputs, dtype=np.float32)
+        if batch_size is None or len(inputs) <= batch_size:
+            return self.session.run(None, {self.input_name: inputs})[0]
+        return np.concatenate([self.session.run(None, {self.input_name: inputs[i:i + batch_size]})[0]
+                               for i in range(0, len(inputs), batch_size)])
+
+    def __call__(self, inputs, training=False):
+        return self.predict(inputs)
+
+
+def configure_tensorflow_threads(threads=INFERENCE_THREADS):
+    """Applies INFERENCE_THREADS to TensorFlow; must run before TF executes any op."""
+    if not threads:
+        return
+    import tensorflow as tf
+
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+    except RuntimeError:
+        # TF was already initialized; the settings from the first call stay in effect.
+        pass
+
+
+def load_keras_model(path):
+    # TensorFlow is imported lazily so the ONNX backend starts without it.
+    configure_tensorflow_threads()
+    from tensorflow.keras.models import load_model # type: ignore
+
+    return load_model(path, compile=False)
+
+
+def load_model(path, backend):
+    if backend == 'onnx':
+        return OnnxModel(path)
+    return load_keras_model(path)
+
+
+def resolve_backend(backend=None):
+    backend = (backend or DEFAULT_BACKEND).lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown prediction backend '{backend}'. Use one of: {', '.join(BACKENDS)}.")
+    return backend
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from email.utils import formatdate
+
+import api_client
+
+# --- Configuration ---
+# -----------------------------------------------------------------------------
+REFRESH_INTERVAL = float(os.getenv("MARKET_REFRESH_INTERVAL", "15"))
+
+
+class MarketSnapshot:
+    """
+    Immutable view of the market at one refresh: coin list, derived global stats and
+    their pre-encoded JSON bodies with validators, so handlers do no work per request.
+    """
+    __slots__ = ("coins", "coins_by_id", "global_stats", "coins_body", "coins_etag",
+                 "global_body", "global_etag", "updated_at", "last_modified", "live")
+
+    def __init__(self, coins, global_stats, updated_at, live):
+        object.__setattr__(self, "coins", tuple(coins))
+        object.__setattr__(self, "coins_by_id", {coin["id"]: coin for coin in self.coins})
+        object.__setattr__(self, "global_stats", global_stats)
+        object.__setattr__(self, "updated_at", updated_at)
+        object.__setattr__(self, "last_modified", formatdate(updated_at, usegmt=True))
+        object.__setattr__(self, "live", live)
+        for name, payload in (("coins", list(self.coins)), ("global", global_stats)):
+            body = json.dumps(payload, separators=(",", ":")).encode()
+            object.__setattr__(self, f"{name}_body", body)
+            object.__setattr__(self, f"{name}_etag", hashlib.blake2b(body, digest_size=12).hexdigest())
+
+    def __setattr__(self, name, value):
+        raise AttributeError("MarketSnapshot is immutable")
+
+
+def merge_ticks(base_coins, ticks):
+    """Overlays live tick fields onto the static coin metadata."""
+    coins = []
+    for base in base_coins:
+        coin = dict(base)
+        tick = ticks.get(base["symbol"])
+        if tick:
+            price = tick.get("VALUE") or tick.get("MOVING_24_HOUR_OPEN") or coin["price"]
+            coin["price"] = price
+            coin["change24h"] = tick.get("MOVING_24_HOUR_CHANGE_PERCENTAGE", coin["change24h"])
+            coin["high24h"] = tick.get("MOVING_24_HOUR_HIGH", coin["high24h"])
+            coin["low24h"] = tick.get("MOVING_24_HOUR_LOW", coin["low24h"])
+            coin["volume24h"] = tick.get("MOVING_24_HOUR_QUOTE_VOLUME", coin["volume24h"])
+            if coin.get("supply"):
+                coin["marketCap"] = price * coin["supply"]
+        coins.append(coin)
+    return coins
+
+
+def derive_global_stats(coins, base_stats):
+    """Computes totals, BTC/ETH dominance and top gainer/loser from a coin list."""
+    stats = dict(base_stats)
+    if not coins:
+        return stats
+    total_cap = sum(coin["marketCap"] or 0 for coin in coins)
+    caps = {coin["symbol"]: coin["marketCap"] or 0 for coin in coins}
+    gainer = max(coins, key=lambda coin: coin["change24h"])
+    loser = min(coins, key=lambda coin: coin["change24h"])
+    stats["totalMarketCap"] = total_cap
+    stats["total24hVolume"] = sum(coin["volume24h"] or 0 for coin in coins)
+    if total_cap:
+        stats["btcDominance"] = round(caps.get("BTC", 0) / total_cap * 100, 1)
+        stats["ethDominance"] = round(caps.get("ETH", 0) / total_cap * 100, 1)
+    stats["topGainer"] = {"symbol": gainer["symbol"], "change": gainer["change24h"]}
+    stats["topLoser"] = {"symbol": loser["symbol"], "change": loser["change24h"]}
+    return stats
+
+
+class MarketRefresher:
+    """
+    Polls the CoinDesk `latest/tick` endpoint for all tracked symbols on a fixed interval
+    and publishes a new MarketSnapshot. Readers only ever dereference the current snapshot.
+    """
+
+    def __init__(self, base_coins, base_stats, interval=REFRESH_INTERVAL, fetch_ticks=api_client.fetch_latest_ticks):
+        self.base_coins = [dict(coin) for coin in base_coins]
+        self.base_stats = dict(base_stats)
+        self.symbols = [coin["symbol"] for coin in base_coins]
+        self.interval = interval
+        self.fetch_ticks = fetch_ticks
+        self._snapshot = MarketSnapshot(self.base_coins, self.base_stats, time.time(), live=False)
+        self._listeners = []
+        self._thread = None
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+        self.last_error = None
+
+    def snapshot(self):
+        return self._snapshot
+
+    def subscribe(self, callback):
+        """Registers callback(old_snapshot, new_snapshot), called after each publish."""
+        self._listeners.append(callback)
+
+    def refresh(self):
+        """Fetches ticks once and publishes a new snapshot if anything changed."""
+        ticks = self.fetch_ticks(self.symbols)
+        coins = merge_ticks(self.base_coins, ticks)
+        snapshot = MarketSnapshot(coins, derive_global_stats(coins, self.base_stats), time.time(), live=True)
+        old = self._snapshot
+        if snapshot.coins_etag == old.coins_etag and snapshot.global_etag == old.global_etag:
+            return old
+        self._snapshot = snapshot
+        for callback in list(self._listeners):
+            try:
+                callback(old, snapshot)
+            except Exception as e:
+                print(f"Market snapshot listener failed: {e}")
+        return snapshot
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Market refresh failed: {e}")
+            self._stop.wait(self.interval)
+
+    def ensure_started(self):
+        """Starts the background thread once per process (safe to call on every request)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="market-refresher", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
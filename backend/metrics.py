@@ -0,0 +1,208 @@
+import bisect
+import contextvars
+import os
+import threading
+import time
+from functools import wraps
+
+# --- Configuration ---
+# -----------------------------------------------------------------------------
+ENABLED = os.getenv("METRICS_ENABLED", "1").lower() not in ("0", "false", "no")
+# Add a Server-Timing header to every response (otherwise only when ?timing=1 is passed).
+SERVER_TIMING_ALWAYS = os.getenv("METRICS_SERVER_TIMING", "").lower() in ("1", "true", "yes")
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{str(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        if not ENABLED:
+            return
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for values, total in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, values)} {total}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        if not ENABLED:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        label_names = self.labels + ("le",)
+        with self._lock:
+            for values, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{self.name}_bucket{_format_labels(label_names, values + (le,))} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, values)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, values)} {count}")
+        return lines
+
+
+# --- Metric definitions ---
+# -----------------------------------------------------------------------------
+STAGE_SECONDS = Histogram("crypto_stage_duration_seconds", "Time spent per hot-path stage.", ("stage",))
+UPSTREAM_SECONDS = Histogram("crypto_upstream_request_duration_seconds", "CoinDesk request latency.", ("endpoint",))
+UPSTREAM_ERRORS = Counter("crypto_upstream_errors_total", "Failed CoinDesk request attempts.", ("endpoint", "reason"))
+CACHE_EVENTS = Counter("crypto_cache_events_total", "Cache hits and misses.", ("cache", "result"))
+CANDLE_GAPS = Counter("crypto_candle_gaps_total", "Candles missing from CoinDesk historical responses.", ("granularity",))
+
+_METRICS = [STAGE_SECONDS, UPSTREAM_SECONDS, UPSTREAM_ERRORS, CACHE_EVENTS, CANDLE_GAPS]
+_collectors = []
+
+
+def register_collector(fn):
+    """Registers fn() -> {gauge_name: value or {labels_tuple: value}} rendered as gauges on scrape."""
+    _collectors.append(fn)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("stage", "started")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.started
+        STAGE_SECONDS.observe(elapsed, self.stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((self.stage, elapsed))
+        return False
+
+
+def span(stage):
+    """Times a block as `stage`; a shared no-op when metrics are disabled."""
+    if not ENABLED:
+        return _NOOP_SPAN
+    return _Span(stage)
+
+
+def timed(stage):
+    """Decorator form of span()."""
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return f(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def cache_event(cache, hit):
+    if ENABLED:
+        CACHE_EVENTS.inc(cache, "hit" if hit else "miss")
+
+
+# --- Per-request Server-Timing ---
+# -----------------------------------------------------------------------------
+def start_request_timing():
+    """Starts collecting spans for the current request; returns a token for stop_request_timing."""
+    return _request_timings.set([])
+
+
+def in_request(fn):
+    """Wraps fn so spans it records on a worker thread still count towards the calling request."""
+    timings = _request_timings.get()
+    if timings is None:
+        return fn
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        token = _request_timings.set(timings)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _request_timings.reset(token)
+    return wrapper
+
+
+def stop_request_timing(token):
+    """Stops collecting and returns the Server-Timing header value for the spans recorded."""
+    timings = _request_timings.get() or []
+    _request_timings.reset(token)
+    totals = {}
+    for stage, elapsed in timings:
+        totals[stage] = totals.get(stage, 0.0) + elapsed
+    return ", ".join(f"{stage.replace('.', '-')};dur={elapsed * 1000:.2f}" for stage, elapsed in totals.items())
+
+
+# --- Exposition ---
+# -----------------------------------------------------------------------------
+def render():
+    """Renders all metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _METRICS:
+        lines.extend(metric.render())
+    for collector in _collectors:
+        try:
+            gauges = collector()
+        except Exception as e:
+            lines.append(f"# collector error: {e}")
+            continue
+        for name, value in gauges.items():
+            lines.append(f"# TYPE {name} gauge")
+            if isinstance(value, dict):
+                for (label_name, label_value), v in sorted(value.items()):
+                    lines.append(f'{name}{{{label_name}="{label_value}"}} {v}')
+            else:
+                lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,329 @@
+import glob
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+
+import numpy as np
+
+from numpy_scaler import NumpyScaler, load_scaler
+
+# --- Configuration ---
+# -----------------------------------------------------------------------------
+MODEL_BASE_DIR = os.getenv("MODEL_BASE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model'))
+BUNDLE_PATH = os.getenv("MODEL_BUNDLE_PATH", os.path.join(MODEL_BASE_DIR, 'models.bundle'))
+
+MAGIC = b"CRYPTOMB"
+FORMAT_VERSION = 1
+# magic, format version, reserved, index length
+_PREAMBLE = struct.Struct("<8sIIQ")
+# Arrays start on cache-line boundaries so views are aligned for SIMD kernels.
+ALIGN = 64
+# Maximum absolute difference allowed between Keras and bundle outputs (scaled space).
+ATOL = 1e-4
+FREQUENCY_SUBDIRS = {'hourly': 'HOURLY', 'daily': 'DAILY'}
+
+_ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0, out=x),
+    'tanh': lambda x: np.tanh(x, out=x),
+    'sigmoid': lambda x: np.reciprocal(np.exp(-x, out=x) + 1, out=x),
+}
+
+
+class BundleFormatError(Exception):
+    """Raised for a file that is not a model bundle or uses an unsupported format version."""
+
+
+def _activation(name):
+    if name not in _ACTIVATIONS:
+        raise ValueError(f"Unsupported activation '{name}'")
+    return _ACTIVATIONS[name]
+
+
+class BundleModel:
+    """
+    Forward pass of one bundled Sequential LSTM/Dense model in NumPy, computed directly on
+    read-only views of the mapped weights. Exposes the subset of the Keras model API used
+    by prediction_engine, the inference batcher and the backtest.
+    """
+
+    def __init__(self, key, layers, arrays, input_shape, output_shape):
+        self.key = key
+        self.input_shape = (None,) + tuple(input_shape)
+        self.output_shape = tuple(output_shape)
+        self._layers = []
+        for layer in layers:
+            weights = [arrays[i] for i in layer.get('weights', ())]
+            if layer['type'] == 'lstm':
+                _activation(layer['activation'])
+                _activation(layer['recurrent_activation'])
+            elif layer['type'] == 'dense':
+                _activation(layer['activation'])
+            self._layers.append((layer, weights))
+
+    @staticmethod
+    def _lstm(x, layer, kernel, recurrent_kernel, bias):
+        batch, steps, _ = x.shape
+        units = layer['units']
+        activation = _ACTIVATIONS[layer['activation']]
+        recurrent_activation = _ACTIVATIONS[layer['recurrent_activation']]
+        # Input projections for every time step in one matmul; only h @ U is sequential.
+        projected = x @ kernel
+        projected += bias
+        h = np.zeros((batch, units), dtype=np.float32)
+        c = np.zeros((batch, units), dtype=np.float32)
+        outputs = np.empty((batch, steps, units), dtype=np.float32) if layer['return_sequences'] else None
+        for t in range(steps):
+            z = projected[:, t] + h @ recurrent_kernel
+            i = recurrent_activation(z[:, :units])
+            f = recurrent_activation(z[:, units:2 * units])
+            g = activation(z[:, 2 * units:3 * units])
+            o = recurrent_activation(z[:, 3 * units:])
+            c = f * c + i * g
+            h = o * activation(c.copy())
+            if outputs is not None:
+                outputs[:, t] = h
+        return outputs if outputs is not None else h
+
+    def predict(self, inputs, verbose=0, batch_size=None):
+        x = np.ascontiguousarray(inputs, dtype=np.float32)
+        for layer, weights in self._layers:
+            kind = layer['type']
+            if kind == 'lstm':
+                x = self._lstm(x, layer, *weights)
+            elif kind == 'dense':
+                kernel, bias = weights
+                x = x @ kernel
+                x += bias
+                x = _ACTIVATIONS[layer['activation']](x)
+            elif kind == 'reshape':
+                x = x.reshape((len(x),) + tuple(layer['target_shape']))
+        return x
+
+    def __call__(self, inputs, training=False):
+        return self.predict(inputs)
+
+
+class ModelBundle:
+    """
+    Read-only view of a bundle file: every model's weights and scaler parameters in one
+    memory-mapped file. Arrays are zero-copy views into the mapping, so opening is
+    near-instant and the pages are shared by every process that maps the same file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, _, index_len = _PREAMBLE.unpack_from(self._mmap, 0)
+        except struct.error:
+            raise BundleFormatError(f"{path} is too short to be a model bundle")
+        if magic != MAGIC:
+            raise BundleFormatError(f"{path} is not a model bundle")
+        if version != FORMAT_VERSION:
+            raise BundleFormatError(f"{path} uses bundle format {version}; expected {FORMAT_VERSION}")
+        start = _PREAMBLE.size
+        self.index = json.loads(bytes(self._mmap[start:start + index_len]))
+        self.arrays = [np.frombuffer(self._mmap, dtype=a['dtype'], count=int(np.prod(a['shape'])),
+                                     offset=a['offset']).reshape(a['shape'])
+                       for a in self.index['arrays']]
+        self._models = {}
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        return self.index.get('version')
+
+    def keys(self):
+        return sorted(self.index['models'])
+
+    def _entry(self, key):
+        entry = self.index['models'].get(key)
+        if entry is None:
+            raise FileNotFoundError(f"Model {key} is not in bundle {self.path}")
+        return entry
+
+    def model(self, key):
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                entry = self._entry(key)
+                model = self._models[key] = BundleModel(
+                    key, entry['layers'], self.arrays, entry['input_shape'], entry['output_shape'])
+            return model
+
+    def nbytes(self, key):
+        """Bytes of the mapping that `key`'s weights and scaler parameters occupy."""
+        entry = self._entry(key)
+        indexes = {i for layer in entry['layers'] for i in layer.get('weights', ())}
+        indexes.update((entry['scaler']['scale'], entry['scaler']['min']))
+        return sum(self.arrays[i].nbytes for i in indexes)
+
+    def scaler(self, key):
+        spec = self._entry(key)['scaler']
+        return NumpyScaler(self.arrays[spec['scale']], self.arrays[spec['min']], spec['feature_range'],
+                           spec['clip'], spec['feature_names'])
+
+
+_open_bundles = {}
+_open_guard = threading.Lock()
+
+
+def open_bundle(path=BUNDLE_PATH):
+    """
+    Returns the ModelBundle for the file currently at `path`. A bundle replaced on disk
+    (new inode or mtime) is mapped afresh; models still using the old one keep it alive.
+    """
+    st = os.stat(path)
+    identity = (st.st_ino, st.st_mtime_ns)
+    with _open_guard:
+        cached = _open_bundles.get(path)
+        if cached is None or cached[0] != identity:
+            cached = _open_bundles[path] = (identity, ModelBundle(path))
+        return cached[1]
+
+
+def load_pair(path, key):
+    """Registry loader: returns (model, scaler) for `key` ('SYMBOL/frequency') from the bundle at `path`."""
+    print(f"Loading {key} from bundle: {path}")
+    bundle = open_bundle(path)
+    return bundle.model(key), bundle.scaler(key)
+
+
+# --- Packaging ---
+# -----------------------------------------------------------------------------
+def _keras_layers(model, arrays):
+    """Translates a loaded Keras Sequential model into bundle layer specs, appending its weights to `arrays`."""
+    def add(weights):
+        indexes = []
+        for w in weights:
+            arrays.append(np.ascontiguousarray(w, dtype=np.float32))
+            indexes.append(len(arrays) - 1)
+        return indexes
+
+    layers = []
+    for layer in model.layers:
+        kind = type(layer).__name__
+        config = layer.get_config()
+        if kind in ('InputLayer', 'Dropout'):
+            continue
+        if kind == 'LSTM':
+            if config.get('go_backwards') or config.get('stateful') or not config.get('use_bias', True):
+                raise ValueError(f"Unsupported LSTM configuration in layer {layer.name}")
+            layers.append({'type': 'lstm', 'units': config['units'], 'activation': config['activation'],
+                           'recurrent_activation': config['recurrent_activation'],
+                           'return_sequences': bool(config['return_sequences']),
+                           'weights': add(layer.get_weights())})
+        elif kind == 'Dense':
+            if not config.get('use_bias', True):
+                raise ValueError(f"Unsupported Dense configuration in layer {layer.name}")
+            layers.append({'type': 'dense', 'activation': config['activation'], 'weights': add(layer.get_weights())})
+        elif kind == 'Reshape':
+            layers.append({'type': 'reshape', 'target_shape': list(config['target_shape'])})
+        else:
+            raise ValueError(f"Unsupported layer type {kind} ({layer.name})")
+    return layers
+
+
+def _bundled_pairs(model_dir):
+    pairs = []
+    for frequency, subdir in FREQUENCY_SUBDIRS.items():
+        for model_path in sorted(glob.glob(os.path.join(model_dir, subdir, '*_model.h5'))):
+            symbol = os.path.basename(model_path)[:-len('_model.h5')]
+            scaler_path = os.path.join(model_dir, subdir, f'{symbol}_scaler.npz')
+            if not os.path.exists(scaler_path):
+                scaler_path = scaler_path[:-len('.npz')] + '.pkl'
+            if os.path.exists(scaler_path):
+                pairs.append((f'{symbol}/{frequency}', model_path, scaler_path))
+    return pairs
+
+
+def write_bundle(entries, arrays, path, version=None):
+    """
+    Writes a bundle atomically: the file is built next to `path`, fsynced and moved into
+    place with os.replace, so readers see either the old or the new bundle, never a mix.
+    """
+    index = {'version': version or time.strftime('%Y%m%d%H%M%S'), 'created_at': time.time(),
+             'models': entries, 'arrays': []}
+    # Offsets depend on the index length, which depends on the offsets; reserve room for them first.
+    index['arrays'] = [{'offset': 0, 'dtype': a.dtype.str, 'shape': list(a.shape)} for a in arrays]
+    reserve = len(json.dumps(index)) + 32 * len(arrays) + ALIGN
+    offset = -(-(_PREAMBLE.size + reserve) // ALIGN) * ALIGN
+    for meta, array in zip(index['arrays'], arrays):
+        meta['offset'] = offset
+        offset = -(-(offset + array.nbytes) // ALIGN) * ALIGN
+    encoded = json.dumps(index).encode()
+    if len(encoded) > reserve:
+        raise ValueError("Bundle index outgrew its reserved space")
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, 0, len(encoded)))
+        f.write(encoded)
+        for meta, array in zip(index['arrays'], arrays):
+            f.seek(meta['offset'])
+            f.write(array.tobytes())
+        f.truncate(offset)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return index
+
+
+def build_bundle(path=BUNDLE_PATH, model_dir=MODEL_BASE_DIR, version=None):
+    """Packs every model/scaler pair under `model_dir` into one bundle. Needs TensorFlow."""
+    from inference_runtime import load_keras_model
+
+    entries, arrays = {}, []
+    for key, model_path, scaler_path in _bundled_pairs(model_dir):
+        model = load_keras_model(model_path)
+        scaler = load_scaler(scaler_path)
+        layers = _keras_layers(model, arrays)
+        arrays.append(np.ascontiguousarray(scaler.scale_, dtype=np.float64))
+        arrays.append(np.ascontiguousarray(scaler.min_, dtype=np.float64))
+        entries[key] = {
+            'input_shape': list(model.input_shape[1:]),
+            'output_shape': list(model.output_shape[1:]),
+            'layers': layers,
+            'scaler': {'scale': len(arrays) - 2, 'min': len(arrays) - 1,
+                       'feature_range': list(scaler.feature_range), 'clip': scaler.clip,
+                       'feature_names': scaler.feature_names},
+        }
+        print(f"Packed {key}")
+    return write_bundle(entries, arrays, path, version)
+
+
+def verify_bundle(path=BUNDLE_PATH, model_dir=MODEL_BASE_DIR, samples=16):
+    """Compares every bundled model with its Keras original; returns {key: max abs diff}."""
+    from inference_runtime import load_keras_model
+
+    bundle = ModelBundle(path)
+    rng = np.random.default_rng(0)
+    diffs = {}
+    for key, model_path, _ in _bundled_pairs(model_dir):
+        model = bundle.model(key)
+        windows = rng.random((samples,) + model.input_shape[1:], dtype=np.float32)
+        expected = load_keras_model(model_path).predict(windows, verbose=0)
+        diffs[key] = float(np.max(np.abs(model.predict(windows) - expected)))
+    return diffs
+
+
+if __name__ == '__main__':
+    # python model_bundle.py [--verify] [--verify-only]
+    # Writes model/models.bundle from the .h5 models and scalers; serve it with PREDICTION_BACKEND=bundle.
+    if '--verify-only' not in sys.argv:
+        index = build_bundle()
+        print(f"Wrote {BUNDLE_PATH} (version {index['version']}, {len(index['models'])} models, "
+              f"{os.path.getsize(BUNDLE_PATH) / 1e6:.1f} MB)")
+    if '--verify' in sys.argv or '--verify-only' in sys.argv:
+        failed = False
+        for key, diff in verify_bundle().items():
+            ok = diff <= ATOL
+            failed |= not ok
+            print(f"{key:<14} max |keras - bundle| = {diff:.2e} {'ok' if ok else 'MISMATCH'}")
+        sys.exit(1 if failed else 0)
@@ -0,0 +1,165 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+# --- Configuration ---
+# -----------------------------------------------------------------------------
+# Upper bound for resident artifacts, in megabytes of on-disk size. 0 disables the cap.
+MAX_RESIDENT_MB = float(os.getenv("MODEL_REGISTRY_MAX_MB", "0"))
+# How often (seconds) a cached entry re-checks the mtimes of its files.
+RELOAD_CHECK_INTERVAL = float(os.getenv("MODEL_REGISTRY_RELOAD_CHECK", "2.0"))
+
+
+class _Entry:
+    __slots__ = ("value", "paths", "mtimes", "nbytes", "checked_at")
+
+    def __init__(self, value, paths, mtimes, nbytes):
+        self.value = value
+        self.paths = paths
+        self.mtimes = mtimes
+        self.nbytes = nbytes
+        self.checked_at = time.monotonic()
+
+
+def _stat_mtimes(paths):
+    return tuple(os.stat(p).st_mtime_ns for p in paths)
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded model/scaler artifacts keyed by (symbol, frequency).
+
+    Each entry is loaded once and kept resident. Entries are evicted in LRU order
+    when the total on-disk size of resident artifacts exceeds `max_bytes`, and are
+    reloaded transparently when any of their files' mtime changes.
+    """
+
+    def __init__(self, max_bytes=None, reload_check_interval=RELOAD_CHECK_INTERVAL):
+        if max_bytes is None:
+            max_bytes = int(MAX_RESIDENT_MB * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self.reload_check_interval = reload_check_interval
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._listeners = []
+        self._resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.evictions = 0
+
+    def subscribe(self, callback):
+        """Registers callback(key), called after a changed file replaced a loaded entry."""
+        self._listeners.append(callback)
+
+    def _key_lock(self, key):
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+
+    def _lookup(self, key):
+        """Returns a still-valid entry for `key`, or None if it must be (re)loaded."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            now = time.monotonic()
+            if now - entry.checked_at < self.reload_check_interval:
+                return entry
+        try:
+            if _stat_mtimes(entry.paths) == entry.mtimes:
+                # Only a confirmed-unchanged entry may skip checks; a stale one must stay
+                # stale for the re-lookup under the load lock.
+                entry.checked_at = now
+                return entry
+        except OSError:
+            pass
+        return None
+
+    def get(self, key, paths, loader, size=None):
+        """
+        Returns the loaded value for `key`, calling `loader(*paths)` on a miss or
+        when one of `paths` has changed on disk since it was loaded. The entry is
+        charged `size(*paths)` bytes against the cap, by default the files' sizes;
+        entries that share one file pass their own share of it.
+        """
+        entry = self._lookup(key)
+        if entry is not None:
+            self.hits += 1
+            metrics.cache_event("model_registry", True)
+            return entry.value
+
+        metrics.cache_event("model_registry", False)
+        # Serialize loads per key so concurrent misses only deserialize once.
+        with self._key_lock(key):
+            entry = self._lookup(key)
+            if entry is not None:
+                self.hits += 1
+                return entry.value
+
+            reloading = key in self._entries
+            mtimes = _stat_mtimes(paths)
+            value = loader(*paths)
+            nbytes = size(*paths) if size is not None else sum(os.path.getsize(p) for p in paths)
+            self._store(key, _Entry(value, tuple(paths), mtimes, nbytes))
+            if reloading:
+                self.reloads += 1
+                for callback in list(self._listeners):
+                    try:
+                        callback(key)
+                    except Exception as e:
+                        print(f"Model reload listener failed: {e}")
+            else:
+                self.misses += 1
+            return value
+
+    def _store(self, key, entry):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._resident_bytes -= old.nbytes
+            self._entries[key] = entry
+            self._resident_bytes += entry.nbytes
+            # Never evict the entry that was just loaded, even if it alone exceeds the cap.
+            while self.max_bytes and self._resident_bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._resident_bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def invalidate(self, key=None):
+        """Drops one entry, or every entry when `key` is None."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._resident_bytes = 0
+            else:
+                old = self._entries.pop(key, None)
+                if old is not None:
+                    self._resident_bytes -= old.nbytes
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries.keys())
+
+    def stats(self):
+        with self._lock:
+            return {
+                "resident": len(self._entries),
+                "resident_bytes": self._resident_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+                "evictions": self.evictions,
+            }
+
+
+# Shared instance used by prediction_engine.
+registry = ModelRegistry()
@@ -0,0 +1,124 @@
+import glob
+import os
+import pickle
+import sys
+import warnings
+
+import numpy as np
+
+
+class NumpyScaler:
+    """
+    Min-max scaler applied with plain NumPy, a drop-in for a fitted sklearn MinMaxScaler
+    at inference time.
+
+    Works on arrays of shape (..., n_features), so a whole (batch, seq_len, features)
+    stack is scaled in one call. The operations match sklearn's in-place
+    `X *= scale_; X += min_` (and the inverse) so results are bit-for-bit identical for
+    inputs of the same dtype.
+    """
+    __slots__ = ("scale_", "min_", "clip", "feature_range", "feature_names")
+
+    def __init__(self, scale, min_, feature_range=(0.0, 1.0), clip=False, feature_names=None):
+        self.scale_ = np.asarray(scale, dtype=np.float64)
+        self.min_ = np.asarray(min_, dtype=np.float64)
+        self.feature_range = tuple(float(v) for v in feature_range)
+        self.clip = bool(clip)
+        self.feature_names = list(feature_names) if feature_names is not None else None
+
+    @classmethod
+    def from_sklearn(cls, scaler):
+        names = getattr(scaler, "feature_names_in_", None)
+        return cls(scaler.scale_, scaler.min_, scaler.feature_range, getattr(scaler, "clip", False),
+                   None if names is None else [str(n) for n in names])
+
+    def transform(self, X, dtype=np.float32):
+        out = np.array(X, dtype=dtype, copy=True)
+        out *= self.scale_
+        out += self.min_
+        if self.clip:
+            np.clip(out, self.feature_range[0], self.feature_range[1], out=out)
+        return out
+
+    def inverse_transform(self, X, dtype=np.float32):
+        out = np.array(X, dtype=dtype, copy=True)
+        out -= self.min_
+        out /= self.scale_
+        return out
+
+    def save(self, path):
+        np.savez(path, scale=self.scale_, min=self.min_, feature_range=np.asarray(self.feature_range),
+                 clip=np.asarray(self.clip),
+                 feature_names=np.asarray(self.feature_names or [], dtype=str))
+
+
+def load_npz(path):
+    with np.load(path, allow_pickle=False) as data:
+        names = [str(n) for n in data["feature_names"]] or None
+        return NumpyScaler(data["scale"], data["min"], tuple(data["feature_range"]),
+                           bool(data["clip"]), names)
+
+
+def load_pickle(path):
+    """Unpickles a sklearn MinMaxScaler (importing sklearn) and converts it."""
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=UserWarning, message="Trying to unpickle estimator MinMaxScaler from version*")
+        with open(path, 'rb') as f:
+            return NumpyScaler.from_sklearn(pickle.load(f))
+
+
+def load_scaler(path):
+    """Loads a scaler from a `.npz` sidecar or, failing that, a sklearn pickle."""
+    if path.endswith('.npz'):
+        return load_npz(path)
+    return load_pickle(path)
+
+
+def sidecar_path(pickle_path):
+    return pickle_path[:-len('.pkl')] + '.npz'
+
+
+# --- One-time conversion ---
+# -----------------------------------------------------------------------------
+def _verify(pickle_path, scaler, samples=4096):
+    """Checks transform/inverse_transform parity with the pickled sklearn scaler."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        with open(pickle_path, 'rb') as f:
+            reference = pickle.load(f)
+        rng = np.random.default_rng(0)
+        data_min = np.asarray(reference.data_min_)
+        data_range = np.asarray(reference.data_range_)
+        for dtype in (np.float32, np.float64):
+            X = (data_min + rng.random((samples, len(data_min))) * data_range * 1.2).astype(dtype)
+            if not np.array_equal(scaler.transform(X, dtype=dtype), reference.transform(X)):
+                return False
+            if not np.array_equal(scaler.inverse_transform(X, dtype=dtype), reference.inverse_transform(X)):
+                return False
+        # Batched (batch, seq_len, features) input must match row-by-row scaling.
+        windows = X.astype(np.float32).reshape(-1, 16, X.shape[1])
+        flat = scaler.transform(windows.reshape(-1, X.shape[1])).reshape(windows.shape)
+        return np.array_equal(scaler.transform(windows), flat)
+
+
+def convert_all(model_dir, verify=False):
+    """Writes a `.npz` sidecar next to every `*_scaler.pkl`. Returns the number of failures."""
+    failures = 0
+    for pickle_path in sorted(glob.glob(os.path.join(model_dir, '*', '*_scaler.pkl'))):
+        scaler = load_pickle(pickle_path)
+        out = sidecar_path(pickle_path)
+        scaler.save(out)
+        status = "written"
+        if verify:
+            ok = _verify(pickle_path, load_npz(out))
+            status += ", parity ok" if ok else ", PARITY MISMATCH"
+            failures += not ok
+        print(f"{out}: {status}")
+    return failures
+
+
+if __name__ == '__main__':
+    # Usage: python numpy_scaler.py [model_dir] [--verify]
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    base_dir = args[0] if args else os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model')
+    sys.exit(1 if convert_all(base_dir, verify='--verify' in sys.argv) else 0)
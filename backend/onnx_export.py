@@ -0,0 +1,81 @@
+import glob
+import os
+import sys
+
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+
+import numpy as np
+
+from inference_runtime import OnnxModel, load_keras_model
+
+OPSET = 17
+# Maximum absolute difference allowed between Keras and ONNX outputs (scaled space).
+ATOL = 1e-4
+
+
+def export_model(h5_path, onnx_path):
+    import tensorflow as tf
+    import tf2onnx
+
+    model = load_keras_model(h5_path)
+    _, seq_len, features = model.input_shape
+    # Leave the batch dimension dynamic so the micro-batcher can stack windows.
+    spec = (tf.TensorSpec((None, seq_len, features), tf.float32, name='window'),)
+
+    @tf.function(input_signature=spec)
+    def forward(window):
+        return model(window, training=False)
+
+    proto, _ = tf2onnx.convert.from_function(forward, input_signature=spec, opset=OPSET)
+    tmp_path = onnx_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(proto.SerializeToString())
+    os.replace(tmp_path, onnx_path)
+    return model
+
+
+def verify_model(keras_model, onnx_path, samples=64):
+    """
+    Compares Keras and ONNX outputs on random windows in the scaler's [0, 1] range,
+    for a single window and for a full batch. Returns the worst absolute difference.
+    """
+    onnx_model = OnnxModel(onnx_path)
+    _, seq_len, features = keras_model.input_shape
+    rng = np.random.default_rng(0)
+    worst = 0.0
+    for batch in (1, samples):
+        windows = rng.random((batch, seq_len, features), dtype=np.float32)
+        expected = keras_model.predict(windows, verbose=0)
+        actual = onnx_model.predict(windows)
+        if expected.shape != actual.shape:
+            return float('inf')
+        worst = max(worst, float(np.abs(expected - actual).max()))
+    return worst
+
+
+def export_all(model_dir, verify=False, verify_only=False):
+    failures = 0
+    for h5_path in sorted(glob.glob(os.path.join(model_dir, '*', '*_model.h5'))):
+        onnx_path = h5_path[:-len('.h5')] + '.onnx'
+        if verify_only:
+            keras_model = load_keras_model(h5_path)
+        else:
+            keras_model = export_model(h5_path, onnx_path)
+        status = "exported" if not verify_only else "checked"
+        if verify or verify_only:
+            worst = verify_model(keras_model, onnx_path)
+            ok = worst <= ATOL
+            failures += not ok
+            status += f", max |keras - onnx| = {worst:.2e}" + ("" if ok else " EXCEEDS TOLERANCE")
+        print(f"{onnx_path}: {status}")
+    return failures
+
+
+if __name__ == '__main__':
+    # Exports every model/{HOURLY,DAILY}/*_model.h5 to a sibling .onnx file and, with --verify,
+    # checks the ONNX outputs against Keras. Needs tensorflow, tf2onnx and onnxruntime;
+    # serving with PREDICTION_BACKEND=onnx only needs onnxruntime.
+    # Usage: python onnx_export.py [model_dir] [--verify] [--verify-only]
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    base_dir = args[0] if args else os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model')
+    sys.exit(1 if export_all(base_dir, verify='--verify' in sys.argv, verify_only='--verify-only' in sys.argv) else 0)
@@ -3,143 +3,540 @@ load_dotenv()
 
 import os
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2' 
-import warnings
-warnings.filterwarnings("ignore", category=UserWarning, message="Trying to unpickle estimator MinMaxScaler from version*")
 
-import pandas as pd
 import numpy as np
-import pickle
-import requests
 import json
-from tensorflow.keras.models import load_model # type: ignore
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+import candle_store
+import coin_catalog
+import deadline
+import metrics
+import ohlcv_parser
+from candle_store import CandleFetchError
+from model_registry import registry
+from forecast_cache import forecast_cache
+from inference_batcher import batcher
+from numpy_scaler import load_scaler
+import inference_runtime
+import model_bundle
+from inference_runtime import MODEL_EXTENSIONS, resolve_backend
+
 # --- Configuration ---
 # -----------------------------------------------------------------------------
-MODEL_BASE_DIR = 'model'
-API_KEY = os.getenv("COINDESK_API_KEY") # Fallback for safety
 COLUMNS_TO_PREDICT = ['price_open', 'price_high', 'price_low', 'price_close', 'volume']
+FREQUENCY_PARAMS = {
+    'hourly': {'seq_len': 168, 'horizon': 24, 'subdir': 'HOURLY', 'unit': 'hour'},
+    'daily': {'seq_len': 90, 'horizon': 30, 'subdir': 'DAILY', 'unit': 'day'},
+}
+# Maximum number of concurrent upstream fetches / forward passes in predict_batch.
+BATCH_MAX_WORKERS = int(os.getenv("PREDICTION_BATCH_WORKERS", "8"))
+# Route forward passes through the shared micro-batcher (set to 0 to call the model directly).
+USE_INFERENCE_BATCHER = os.getenv("INFERENCE_BATCHING", "1").lower() not in ("0", "false", "no")
+# Load every model/scaler pair into the registry at import time when set.
+PRELOAD_MODELS = os.getenv("MODEL_REGISTRY_PRELOAD", "").lower() in ("1", "true", "yes")
+# Stochastic forward passes per uncertainty estimate, run as one batch.
+UNCERTAINTY_SAMPLES = int(os.getenv("UNCERTAINTY_SAMPLES", "32"))
+# 'perturb' jitters the input window (every backend); 'dropout' keeps dropout active (keras only).
+UNCERTAINTY_METHOD = os.getenv("UNCERTAINTY_METHOD", "perturb").lower()
+# Input noise per feature, as a multiple of the window's one-step (scaled) volatility.
+UNCERTAINTY_NOISE = float(os.getenv("UNCERTAINTY_NOISE", "1.0"))
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+CLOSE = COLUMNS_TO_PREDICT.index('price_close')
+
+# --- Model Registry ---
+# -----------------------------------------------------------------------------
+def _on_model_reload(key):
+    # Forecasts made by the replaced model must not outlive it.
+    coin_symbol, frequency, _ = key
+    forecast_cache.invalidate(coin_symbol, frequency)
+
+
+registry.subscribe(_on_model_reload)
+
+
+def _load_artifacts(model_path, scaler_path):
+    print(f"Loading model from: {model_path}")
+    print(f"Loading scaler from: {scaler_path}")
+    backend = 'onnx' if model_path.endswith(MODEL_EXTENSIONS['onnx']) else 'keras'
+    model = inference_runtime.load_model(model_path, backend)
+    scaler = load_scaler(scaler_path)
+    return model, scaler
+
+
+def get_model_and_scaler(coin_symbol, frequency, backend=None):
+    """
+    Returns the resident (model, scaler) pair for a symbol/frequency, loading it on first use.
+    `backend` is 'keras', 'onnx' or 'bundle' (default: PREDICTION_BACKEND).
+    Raises FileNotFoundError if the coin catalog has no such model.
+    """
+    backend = resolve_backend(backend)
+    paths = coin_catalog.get_catalog().artifact_paths(coin_symbol, frequency, backend)
+    if paths is None:
+        raise FileNotFoundError(f"Model or scaler file not found for {coin_symbol}/{frequency} ({backend}).")
+    size = None
+    if backend == 'bundle':
+        # One file holds every model; the registry reloads it when the bundle is replaced
+        # and charges each key only its own arrays, not the whole file.
+        key = f'{coin_symbol}/{frequency}'
+        loader = lambda path: model_bundle.load_pair(path, key)
+        size = lambda path: model_bundle.open_bundle(path).nbytes(key)
+    else:
+        loader = _load_artifacts
+    with metrics.span('model_load'):
+        return registry.get((coin_symbol, frequency, backend), paths, loader, size)
+
+
+def available_models():
+    """
+    Lists (symbol, frequency) pairs that have both a model and a scaler, per the coin catalog.
+    """
+    return coin_catalog.get_catalog().models(resolve_backend())
+
+
+def preload_models():
+    """
+    Eagerly loads every available model/scaler pair into the registry.
+    Returns the list of pairs that failed to load.
+    """
+    failed = []
+    for coin_symbol, frequency in available_models():
+        try:
+            get_model_and_scaler(coin_symbol, frequency)
+        except Exception as e:
+            print(f"Failed to preload {coin_symbol}/{frequency}: {e}")
+            failed.append((coin_symbol, frequency))
+    return failed
 
 # --- API Function (Adapted for Multivariate Model) ---
 # -----------------------------------------------------------------------------
 def get_latest_data_from_api(instrument, limit, time_unit):
     """
-    Fetches the latest data from CoinDesk API and formats it for the multivariate model.
+    Returns the latest `limit` candles formatted for the multivariate model, as
+    (timestamps, values): int64 candle open times and a float32 (n, 5) array ordered
+    like COLUMNS_TO_PREDICT. Candles are read from the local candle store, which only
+    fetches candles newer than the last stored one from the CoinDesk API.
     """
-    if not API_KEY:
-        print("Error: COINDESK_API_KEY not found. Please set it in your .env file.")
-        return None
-        
-    api_endpoint = 'hours' if time_unit == 'hour' else 'days'
-    url = f'https://data-api.coindesk.com/index/cc/v1/historical/{api_endpoint}'
-
-    params = {
-        'market': 'cadli', 'instrument': instrument, 'limit': limit,
-        'aggregate': 1, 'fill': 'true', 'apply_mapping': 'true',
-        'response_format': 'JSON', 'to_ts': int(datetime.now().timestamp()),
-        'api_key': API_KEY
-    }
-
     try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-        
-        if 'Data' not in data or not data['Data']:
-            print("API response did not contain 'Data'.")
-            return None
-
-        df = pd.DataFrame(data['Data'])
-        # Rename uppercase API columns to the lowercase names the model was trained on
-        df.rename(columns={
-            'OPEN': 'price_open', 'HIGH': 'price_high', 'LOW': 'price_low',
-            'CLOSE': 'price_close', 'VOLUME': 'volume'
-        }, inplace=True)
-        
-        # Ensure all required columns are present after renaming
-        if not all(col in df.columns for col in COLUMNS_TO_PREDICT):
-            print("Error: API response missing one or more required columns after renaming.")
-            return None
-            
-        return df[COLUMNS_TO_PREDICT]
-    
-    except requests.exceptions.RequestException as e:
-        print(f"API request failed: {e}")
-        return None
-    except KeyError as e:
-        print(f"Error processing API data, key not found: {e}")
+        with metrics.span('candle_sync'):
+            timestamps, values = candle_store.get_store().get_window_arrays(instrument, time_unit, limit)
+    except CandleFetchError as e:
+        print(f"Error: {e}")
         return None
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
         return None
 
+    if not len(timestamps):
+        print("No candles available for prediction.")
+        return None
+    return timestamps, values
 
-def predict_values(coin_symbol, frequency, n):
+
+class PredictionError(Exception):
+    """Raised inside the prediction pipeline; surfaced to callers as an {'error': ...} dict."""
+
+
+def _resolve_params(frequency):
+    params = FREQUENCY_PARAMS.get(frequency)
+    if params is None:
+        raise PredictionError("Invalid frequency. Please use 'hourly' or 'daily'.")
+    return params
+
+
+def _fetch_window(coin_symbol, params):
+    """
+    Fetches the latest `seq_len` candles for a symbol.
+    Returns (window_end_ts, window): the open time of the newest candle and a float32
+    (seq_len, 5) array. Raises PredictionError if the window is short or has gaps.
+    """
+    instrument = f'{coin_symbol}-INR'
+    latest_data = get_latest_data_from_api(instrument, params['seq_len'], params['unit'])
+
+    if latest_data is None or len(latest_data[0]) < params['seq_len']:
+        raise PredictionError("Could not fetch sufficient recent data for prediction.")
+
+    timestamps, values = latest_data[0][-params['seq_len']:], latest_data[1][-params['seq_len']:]
+    gaps = ohlcv_parser.find_gaps(timestamps, candle_store.GRANULARITY_SECONDS[params['unit']])
+    if gaps:
+        raise PredictionError(f"Recent {coin_symbol} data is missing {sum(n for _, n in gaps)} candle(s); "
+                              "cannot build a contiguous input window.")
+    return int(timestamps[-1]), values
+
+
+def _load_for_prediction(coin_symbol, frequency, backend=None):
+    try:
+        return get_model_and_scaler(coin_symbol, frequency, backend)
+    except (FileNotFoundError, ValueError) as e:
+        raise PredictionError(str(e))
+    except Exception as e:
+        raise PredictionError(f"Error loading model or scaler: {e}")
+
+
+def _forecast_from_windows(key, model, scaler, windows):
+    """
+    Stacks input windows into one (batch, seq_len, 5) tensor, runs a single forward pass
+    and returns the inverse-transformed (batch, horizon, 5) forecasts.
+    """
+    with metrics.span('scale'):
+        input_sequence = scaler.transform(np.stack([np.asarray(w, dtype=np.float32) for w in windows]))
+    with metrics.span('inference'):
+        if USE_INFERENCE_BATCHER:
+            # Concurrent requests for the same model are coalesced into one predict call.
+            futures = [batcher.submit(key, model, window) for window in input_sequence]
+            try:
+                # Bounded by the calling job's deadline, so a stuck dispatcher cannot pin a worker.
+                full_forecast_scaled = np.stack([future.result(deadline.remaining()) for future in futures])
+            except TimeoutError:
+                raise deadline.DeadlineExceeded("Timed out waiting for the model")
+        else:
+            full_forecast_scaled = model.predict(input_sequence, verbose=0)
+    with metrics.span('inverse_scale'):
+        return scaler.inverse_transform(full_forecast_scaled)
+
+
+def _forecast_from_window(key, model, scaler, window):
+    """Runs one forward pass and returns the inverse-transformed (horizon, 5) forecast."""
+    return _forecast_from_windows(key, model, scaler, [window])[0]
+
+
+def get_forecast(coin_symbol, frequency, backend=None):
+    """
+    Returns the ForecastEntry holding the full forecast horizon for a symbol/frequency.
+    Served from the forecast cache until the next candle closes; cached horizons are shared
+    between backends, whose outputs agree to within onnx_export.ATOL. Raises PredictionError.
+    """
+    params = _resolve_params(frequency)
+    entry = forecast_cache.get_current(coin_symbol, frequency)
+    metrics.cache_event('forecast', entry is not None)
+    if entry is not None:
+        return entry
+
+    model, scaler = _load_for_prediction(coin_symbol, frequency, backend)
+    window_end_ts, window = _fetch_window(coin_symbol, params)
+
+    # Another request may already have computed this exact window.
+    entry = forecast_cache.get(coin_symbol, frequency, window_end_ts)
+    if entry is not None:
+        return entry
+
+    full_forecast_inr = _forecast_from_window((coin_symbol, frequency), model, scaler, window)
+    return forecast_cache.put(coin_symbol, frequency, window_end_ts, full_forecast_inr)
+
+
+def _step_values(row):
+    return {
+        'open': float(row[0]),
+        'high': float(row[1]),
+        'low': float(row[2]),
+        'close': float(row[3]),
+        'volume': float(row[4])
+    }
+
+
+def predict_values(coin_symbol, frequency, n, backend=None):
     """
     Predicts values and returns the result as a Python dictionary.
+    `backend` selects the model runtime ('keras' or 'onnx', default PREDICTION_BACKEND).
     Returns a dictionary with an 'error' key on failure.
     """
     frequency = frequency.lower()
-    # ... (parameter checking for frequency and n)
-    if frequency == 'hourly':
-        params = {'seq_len': 168, 'horizon': 24, 'subdir': 'HOURLY', 'unit': 'hour'}
+    try:
+        params = _resolve_params(frequency)
         if not 1 <= n <= params['horizon']:
             return {'error': f"Prediction step 'n' must be between 1 and {params['horizon']}."}
-    elif frequency == 'daily':
-        # ... (same logic for daily)
-        params = {'seq_len': 90, 'horizon': 30, 'subdir': 'DAILY', 'unit': 'day'}
+        entry = get_forecast(coin_symbol, frequency, backend)
+    except PredictionError as e:
+        return {'error': str(e)}
+
+    prediction_step_values = entry.values[n - 1]
+
+    result = {
+        'coin_symbol': coin_symbol,
+        'frequency': frequency,
+        'prediction_step': n,
+        'timestamp': datetime.now().isoformat(),
+        'predicted_values': _step_values(prediction_step_values)
+    }
+
+    return result
+
+
+def _prepare_batch_key(key):
+    """Loads the model and fetches the input window for one (symbol, frequency) key."""
+    coin_symbol, frequency = key
+    params = _resolve_params(frequency)
+    model, scaler = _load_for_prediction(coin_symbol, frequency)
+    window_end_ts, window = _fetch_window(coin_symbol, params)
+    return model, scaler, window_end_ts, window
+
+
+def _run_batch_key(key, prepared, with_bands=False):
+    coin_symbol, frequency = key
+    model, scaler, window_end_ts, window = prepared
+    entry = forecast_cache.get(coin_symbol, frequency, window_end_ts)
+    if with_bands and (entry is None or entry.bands is None):
+        return _forecast_with_bands(coin_symbol, frequency, model, scaler, window_end_ts, window, entry)
+    if entry is not None:
+        return entry
+    full_forecast_inr = _forecast_from_windows(key, model, scaler, [window])[0]
+    return forecast_cache.put(coin_symbol, frequency, window_end_ts, full_forecast_inr)
+
+
+def _compute_entries(keys, with_bands=False):
+    """
+    Fetches input windows for many (symbol, frequency) keys concurrently and runs their
+    forward passes in parallel. Returns (entries, errors) dicts keyed by (symbol, frequency).
+    With `with_bands` each entry also gets its uncertainty bands (see predict_distribution).
+    """
+    entries, errors = {}, {}
+    if not keys:
+        return entries, errors
+    with ThreadPoolExecutor(max_workers=max(1, min(BATCH_MAX_WORKERS, len(keys)))) as pool:
+        prepared = {key: pool.submit(deadline.propagate(metrics.in_request(_prepare_batch_key)), key) for key in keys}
+        running = {}
+        for key, future in prepared.items():
+            try:
+                running[key] = pool.submit(deadline.propagate(metrics.in_request(_run_batch_key)), key, future.result(),
+                                           with_bands)
+            except PredictionError as e:
+                errors[key] = str(e)
+            except Exception as e:
+                errors[key] = f"Prediction failed: {e}"
+        for key, future in running.items():
+            try:
+                entries[key] = future.result()
+            except Exception as e:
+                errors[key] = f"Prediction failed: {e}"
+    return entries, errors
+
+
+def predict_batch(items):
+    """
+    Predicts many (coin_symbol, frequency, n) tuples at once.
+
+    Input windows are fetched concurrently, every request that shares a model is answered
+    from a single forward pass, and forward passes for different models run in parallel.
+    Returns one result per item, in order; failed items carry an 'error' key.
+    """
+    results = [None] * len(items)
+    pending = {}
+    for i, item in enumerate(items):
+        try:
+            coin_symbol, frequency, n = item
+            if not isinstance(coin_symbol, str) or not isinstance(frequency, str):
+                raise TypeError
+            frequency = frequency.lower()
+            n = int(n)
+            params = _resolve_params(frequency)
+        except PredictionError as e:
+            results[i] = {'error': str(e)}
+            continue
+        except (TypeError, ValueError):
+            results[i] = {'error': "Each item must be a (coin_symbol, frequency, n) tuple."}
+            continue
         if not 1 <= n <= params['horizon']:
-            return {'error': f"Prediction step 'n' must be between 1 and {params['horizon']}."}
+            results[i] = {'error': f"Prediction step 'n' must be between 1 and {params['horizon']}."}
+            continue
+        pending.setdefault((coin_symbol, frequency), []).append((i, n))
+
+    cached = {}
+    to_compute = []
+    for key in pending:
+        entry = forecast_cache.get_current(*key)
+        metrics.cache_event('forecast', entry is not None)
+        if entry is not None:
+            cached[key] = entry
+        else:
+            to_compute.append(key)
+
+    entries, errors = _compute_entries(to_compute)
+    entries.update(cached)
+
+    timestamp = datetime.now().isoformat()
+    for key, requested in pending.items():
+        coin_symbol, frequency = key
+        for i, n in requested:
+            if key in errors:
+                results[i] = {'coin_symbol': coin_symbol, 'frequency': frequency,
+                              'prediction_step': n, 'error': errors[key]}
+                continue
+            results[i] = {
+                'coin_symbol': coin_symbol,
+                'frequency': frequency,
+                'prediction_step': n,
+                'timestamp': timestamp,
+                'predicted_values': _step_values(entries[key].values[n - 1])
+            }
+    return results
+
+
+def sample_forecasts(model, scaler, window, samples=UNCERTAINTY_SAMPLES, method=UNCERTAINTY_METHOD,
+                     noise=UNCERTAINTY_NOISE, seed=None):
+    """
+    Runs `samples` stochastic forward passes over one input window in a single predict call.
+    Sample 0 is the unperturbed forecast. Returns inverse-transformed (samples, horizon, 5) forecasts.
+    """
+    scaled = scaler.transform(np.asarray(window, dtype=np.float32)[None])[0]
+    batch = np.repeat(scaled[None], samples, axis=0)
+    if method == 'dropout' and hasattr(model, 'layers'):
+        # Keras only: dropout active at inference (MC dropout). ONNX and bundle graphs have none.
+        with metrics.span('inference'):
+            outputs = np.asarray(model(batch, training=True))
+        outputs[0] = np.asarray(model.predict(batch[:1], verbose=0)).reshape(outputs.shape[1:])
     else:
-        return {'error': "Invalid frequency. Please use 'hourly' or 'daily'."}
+        # Jitter every step by a multiple of the window's own step-to-step volatility, so calm
+        # markets get narrow bands and volatile ones wide bands.
+        rng = np.random.default_rng(seed)
+        volatility = np.diff(scaled, axis=0).std(axis=0)
+        batch[1:] += rng.standard_normal(batch[1:].shape, dtype=np.float32) * (noise * volatility)
+        with metrics.span('inference'):
+            outputs = np.asarray(model.predict(batch, verbose=0, batch_size=samples))
+    with metrics.span('inverse_scale'):
+        return scaler.inverse_transform(outputs.reshape(samples, -1, scaled.shape[-1]))
 
-    # --- The rest of your function is almost the same ---
-    model_path = os.path.join(MODEL_BASE_DIR, params['subdir'], f'{coin_symbol}_model.h5')
-    scaler_path = os.path.join(MODEL_BASE_DIR, params['subdir'], f'{coin_symbol}_scaler.pkl')
 
-    print(f"Loading model from: {model_path}")
-    print(f"Loading scaler from: {scaler_path}")
+def _bands(samples):
+    """Vectorized quantiles over the sample axis: {quantile: (horizon, 5) array}."""
+    quantiles = np.quantile(samples, QUANTILES, axis=0)
+    return {q: values for q, values in zip(QUANTILES, quantiles)}
+
+
+def _direction_confidence(samples, last_close):
+    """Per step, the share of samples (in %) agreeing with the point forecast on the close's direction."""
+    moves = np.sign(samples[:, :, CLOSE] - last_close)
+    return (moves == moves[0]).mean(axis=0) * 100.0
+
 
-    if not all(os.path.exists(p) for p in [model_path, scaler_path]):
-        return {'error': f"Model or scaler file not found for {coin_symbol}/{frequency}."}
-        
+def _forecast_with_bands(coin_symbol, frequency, model, scaler, window_end_ts, window, entry=None,
+                         samples=UNCERTAINTY_SAMPLES):
+    """
+    Samples forecasts for one window and attaches their bands to its cache entry (storing
+    sample 0, the unperturbed forecast, as the entry when there is none). Returns the entry.
+    """
+    sampled = sample_forecasts(model, scaler, window, samples)
+    if entry is None:
+        entry = forecast_cache.put(coin_symbol, frequency, window_end_ts, sampled[0])
+    last_close = float(np.asarray(window, dtype=np.float64)[-1, CLOSE])
+    entry.bands = {
+        'quantiles': _bands(sampled),
+        'confidence': _direction_confidence(sampled, last_close),
+        'last_close': last_close,
+        'samples': samples,
+    }
+    return entry
+
+
+def _has_bands(entry, samples):
+    return entry is not None and entry.bands is not None and entry.bands['samples'] == samples
+
+
+def predict_distribution(coin_symbol, frequency, n, samples=UNCERTAINTY_SAMPLES, backend=None):
+    """
+    Point forecast for step `n` plus a confidence band from batched stochastic inference.
+    `confidence` is the percentage of samples agreeing with the point forecast on whether the
+    close will be above or below the last close. Bands are computed once per input window,
+    usually by the forecast scheduler, so this is normally a cache lookup.
+    Returns a dictionary with an 'error' key on failure.
+    """
+    frequency = frequency.lower()
     try:
-        # NOTE: This part can still be slow. The caching model is recommended.
-        model = load_model(model_path, compile=False) 
-        with open(scaler_path, 'rb') as f:
-            scaler = pickle.load(f)
-    except Exception as e:
-        return {'error': f"Error loading model or scaler: {e}"}
-    
-    instrument = f'{coin_symbol}-INR'
-    latest_data = get_latest_data_from_api(instrument, params['seq_len'], params['unit'])
-    
-    if latest_data is None or len(latest_data) < params['seq_len']:
-        return {'error': "Could not fetch sufficient recent data for prediction."}
-
-    # ... (scaling, prediction, and inverse_transform logic)
-    scaled_input = scaler.transform(latest_data)
-    input_sequence = np.array([scaled_input])
-    full_forecast_scaled = model.predict(input_sequence, verbose=0)[0]
-    full_forecast_inr = scaler.inverse_transform(full_forecast_scaled)
-    prediction_step_values = full_forecast_inr[n - 1]
-
-    # --- This is your successful return dictionary ---
-    result = {
+        params = _resolve_params(frequency)
+        if not 1 <= n <= params['horizon']:
+            return {'error': f"Prediction step 'n' must be between 1 and {params['horizon']}."}
+    except PredictionError as e:
+        return {'error': str(e)}
+
+    entry = forecast_cache.get_current(coin_symbol, frequency)
+    if not _has_bands(entry, samples):
+        # Miss: fetch the live window; another request may have banded it meanwhile.
+        try:
+            model, scaler = _load_for_prediction(coin_symbol, frequency, backend)
+            window_end_ts, window = _fetch_window(coin_symbol, params)
+        except PredictionError as e:
+            return {'error': str(e)}
+        entry = forecast_cache.get(coin_symbol, frequency, window_end_ts)
+        if not _has_bands(entry, samples):
+            metrics.cache_event('forecast_bands', False)
+            try:
+                entry = _forecast_with_bands(coin_symbol, frequency, model, scaler, window_end_ts, window,
+                                             entry, samples)
+            except Exception as e:
+                return {'error': f"Prediction failed: {e}"}
+        else:
+            metrics.cache_event('forecast_bands', True)
+    else:
+        metrics.cache_event('forecast_bands', True)
+
+    bands = entry.bands
+    return {
         'coin_symbol': coin_symbol,
         'frequency': frequency,
         'prediction_step': n,
-        'timestamp': datetime.now().isoformat(), # Great addition!
+        'timestamp': datetime.now().isoformat(),
+        'predicted_values': _step_values(entry.values[n - 1]),
+        'last_close': bands['last_close'],
+        'confidence': float(bands['confidence'][n - 1]),
+        'samples': bands['samples'],
+        'quantiles': {str(q): _step_values(values[n - 1]) for q, values in bands['quantiles'].items()},
+    }
+
+
+def precompute_forecasts(frequency, symbols=None):
+    """
+    Computes fresh forecasts, with their uncertainty bands, for every model of `frequency`
+    (or only `symbols`), ignoring the current cache entries, and publishes them to the
+    forecast cache. Returns (entries, errors) dicts keyed by (symbol, frequency).
+    """
+    keys = [(s, f) for s, f in available_models() if f == frequency and (symbols is None or s in symbols)]
+    return _compute_entries(keys, with_bands=True)
+
+
+def predict_horizon(coin_symbol, frequency, backend=None):
+    """
+    Returns the whole forecast curve (every step of the horizon) as column arrays.
+    Returns a dictionary with an 'error' key on failure.
+    """
+    frequency = frequency.lower()
+    try:
+        entry = get_forecast(coin_symbol, frequency, backend)
+    except PredictionError as e:
+        return {'error': str(e)}
+
+    values = entry.values
+    return {
+        'coin_symbol': coin_symbol,
+        'frequency': frequency,
+        'timestamp': datetime.now().isoformat(),
+        'window_end_timestamp': entry.window_end_ts,
+        'target_timestamps': entry.target_timestamps(),
         'predicted_values': {
-            'open': float(prediction_step_values[0]),
-            'high': float(prediction_step_values[1]),
-            'low': float(prediction_step_values[2]),
-            'close': float(prediction_step_values[3]),
-            'volume': float(prediction_step_values[4])
+            'open': values[:, 0].astype(float).tolist(),
+            'high': values[:, 1].astype(float).tolist(),
+            'low': values[:, 2].astype(float).tolist(),
+            'close': values[:, 3].astype(float).tolist(),
+            'volume': values[:, 4].astype(float).tolist()
         }
     }
-    
-    return result
+
+
+def _collect_gauges():
+    registry_stats = registry.stats()
+    batcher_stats = batcher.stats()
+    return {
+        'crypto_model_registry_resident': registry_stats['resident'],
+        'crypto_model_registry_resident_bytes': registry_stats['resident_bytes'],
+        'crypto_forecast_cache_entries': forecast_cache.stats()['entries'],
+        'crypto_inference_queue_depth': {
+            ('model', name): model_stats['queue_depth'] for name, model_stats in batcher_stats['models'].items()},
+    }
+
+
+metrics.register_collector(_collect_gauges)
+
+if PRELOAD_MODELS:
+    preload_models()
 
 
 # --- Main Execution (Demonstration) ---
@@ -0,0 +1,210 @@
+import os
+import queue
+import secrets
+import threading
+import time
+
+import deadline
+import metrics
+
+# --- Configuration ---
+# -----------------------------------------------------------------------------
+# Threads running prediction jobs; web request threads never run the model themselves.
+WORKERS = int(os.getenv("PREDICTION_JOB_WORKERS", "4"))
+# Jobs allowed to wait for a worker; beyond this submissions are refused with 429.
+MAX_QUEUED = int(os.getenv("PREDICTION_JOB_QUEUE", "64"))
+# A job not finished within this many seconds of submission is dropped (if still queued)
+# or expired (if running: blocking model and upstream calls give up at the deadline).
+DEADLINE_SECONDS = float(os.getenv("PREDICTION_JOB_DEADLINE", "30"))
+# Finished jobs stay pollable this long.
+RETENTION_SECONDS = float(os.getenv("PREDICTION_JOB_RETENTION", "300"))
+# Longest a single poll may block waiting for a job to finish.
+MAX_WAIT_SECONDS = float(os.getenv("PREDICTION_JOB_MAX_WAIT", "25"))
+# POST /api/prediction waits this long for the result before answering 202 with a job id.
+SYNC_WAIT_SECONDS = float(os.getenv("PREDICTION_SYNC_WAIT", "5"))
+
+QUEUED, RUNNING, DONE, FAILED, EXPIRED = 'queued', 'running', 'done', 'failed', 'expired'
+
+
+class QueueFull(Exception):
+    """Raised by submit when the job queue is full; `retry_after` is a suggested wait in seconds."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Prediction queue is full, retry in {retry_after} s")
+        self.retry_after = retry_after
+
+
+class Job:
+    __slots__ = ("id", "owner", "fn", "args", "status", "result", "error", "created_at",
+                 "started_at", "finished_at", "deadline", "_done")
+
+    def __init__(self, owner, fn, args, deadline):
+        self.id = secrets.token_urlsafe(12)
+        self.owner = owner
+        self.fn = fn
+        self.args = args
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.deadline = self.created_at + deadline
+        self._done = threading.Event()
+
+    @property
+    def finished(self):
+        return self._done.is_set()
+
+    def wait(self, timeout):
+        return self._done.wait(max(0.0, timeout))
+
+    def finish(self, status, result=None, error=None):
+        self.status, self.result, self.error = status, result, error
+        self.finished_at = time.time()
+        self.fn = self.args = None
+        self._done.set()
+
+    def to_dict(self):
+        return {"jobId": self.id, "status": self.status, "error": self.error}
+
+
+class JobQueue:
+    """
+    Bounded pool that runs prediction jobs off the request threads.
+
+    submit() only enqueues and returns a Job immediately (or raises QueueFull when
+    MAX_QUEUED jobs are already waiting). Clients then poll or long-poll the job by id.
+    Jobs still queued at their deadline are dropped without running, so a backlog
+    never turns into work nobody is waiting for; running jobs stop waiting on the model
+    and upstream at the same deadline, so a stuck dependency cannot pin every worker.
+    """
+
+    def __init__(self, workers=WORKERS, max_queued=MAX_QUEUED, deadline=DEADLINE_SECONDS,
+                 retention=RETENTION_SECONDS):
+        self.workers = workers
+        self.deadline = deadline
+        self.retention = retention
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        self._start_lock = threading.Lock()
+        self._avg_seconds = 1.0
+        self._pruned_at = 0.0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.expired = 0
+
+    def _ensure_workers(self):
+        if len(self._threads) == self.workers and all(t.is_alive() for t in self._threads):
+            return
+        with self._start_lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name=f"prediction-job-{len(self._threads)}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def retry_after(self):
+        """Seconds until a queue slot is likely to free up, from the average job duration."""
+        backlog = self._queue.qsize() + self.running
+        return max(1, round(backlog * self._avg_seconds / max(1, self.workers)))
+
+    def submit(self, owner, fn, *args, deadline=None):
+        """Queues fn(*args) for `owner`; returns the Job. Raises QueueFull."""
+        self._ensure_workers()
+        self._prune()
+        job = Job(owner, fn, args, self.deadline if deadline is None else deadline)
+        with self._lock:
+            self._jobs[job.id] = job
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job.id]
+                self.rejected += 1
+            raise QueueFull(self.retry_after())
+        return job
+
+    def get(self, job_id, owner=None):
+        """Returns the job, or None if it is unknown, pruned or belongs to someone else."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or (owner is not None and job.owner != owner):
+            return None
+        return job
+
+    def wait(self, job, timeout):
+        """Blocks up to `timeout` seconds (capped at MAX_WAIT_SECONDS) for the job to finish."""
+        job.wait(min(timeout, MAX_WAIT_SECONDS))
+        if not job.finished and job.status == QUEUED and time.time() >= job.deadline:
+            # Past its deadline and still waiting for a worker; the worker will drop it.
+            return EXPIRED
+        return job.status
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            if time.time() >= job.deadline:
+                with self._lock:
+                    self.expired += 1
+                job.finish(EXPIRED, error="Prediction was not started before its deadline")
+                continue
+            job.status, job.started_at = RUNNING, time.time()
+            with self._lock:
+                self.running += 1
+            try:
+                with deadline.scope(job.deadline):
+                    result = job.fn(*job.args)
+                if isinstance(result, dict) and 'error' in result:
+                    if time.time() >= job.deadline:
+                        # e.g. an upstream fetch cut short by the deadline and reported as an error
+                        job.finish(EXPIRED, error=f"Prediction did not finish before its deadline: {result['error']}")
+                    else:
+                        job.finish(FAILED, error=result['error'])
+                else:
+                    job.finish(DONE, result=result)
+            except deadline.DeadlineExceeded:
+                job.finish(EXPIRED, error="Prediction did not finish before its deadline")
+            except Exception as e:
+                print(f"Prediction job {job.id} failed: {e}")
+                job.finish(FAILED, error=f"Prediction failed: {e}")
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.completed += 1
+                    self.expired += job.status == EXPIRED
+                    self._avg_seconds = 0.9 * self._avg_seconds + 0.1 * (job.finished_at - job.started_at)
+
+    def _prune(self):
+        now = time.time()
+        if now - self._pruned_at < 1.0:
+            return
+        self._pruned_at = now
+        cutoff = now - self.retention
+        with self._lock:
+            for job_id in [i for i, j in self._jobs.items() if j.finished and j.finished_at < cutoff]:
+                del self._jobs[job_id]
+
+    def stats(self):
+        return {"queued": self._queue.qsize(), "running": self.running, "completed": self.completed,
+                "rejected": self.rejected, "expired": self.expired, "tracked": len(self._jobs),
+                "avg_seconds": self._avg_seconds}
+
+
+# Shared instance used by app.
+jobs = JobQueue()
+
+
+def _collect_gauges():
+    stats = jobs.stats()
+    return {
+        'crypto_prediction_jobs_queued': stats['queued'],
+        'crypto_prediction_jobs_running': stats['running'],
+        'crypto_prediction_jobs_rejected': stats['rejected'],
+    }
+
+
+metrics.register_collector(_collect_gauges)
@@ -0,0 +1,222 @@
+import base64
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+# --- Configuration ---
+# -----------------------------------------------------------------------------
+STORE_PATH = os.getenv("PREDICTION_STORE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'predictions.sqlite'))
+# The writer commits at most this many queued predictions per transaction...
+WRITE_BATCH = int(os.getenv("PREDICTION_STORE_BATCH", "256"))
+# ...after waiting at most this long for more to arrive.
+WRITE_FLUSH_MS = float(os.getenv("PREDICTION_STORE_FLUSH_MS", "50"))
+# Queued writes beyond this block the caller instead of growing memory without bound.
+MAX_QUEUED = int(os.getenv("PREDICTION_STORE_MAX_QUEUED", "10000"))
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+COLUMNS = (
+    'user', 'coin', 'symbol', 'frequency', 'units', 'created_at', 'window_end_ts', 'target_ts',
+    'base_price', 'predicted_open', 'predicted_high', 'predicted_low', 'predicted_close',
+    'predicted_volume', 'confidence',
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY,
+    user TEXT NOT NULL,
+    coin TEXT,
+    symbol TEXT NOT NULL,
+    frequency TEXT NOT NULL,
+    units INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    window_end_ts INTEGER,
+    target_ts INTEGER NOT NULL,
+    base_price REAL,
+    predicted_open REAL,
+    predicted_high REAL,
+    predicted_low REAL,
+    predicted_close REAL NOT NULL,
+    predicted_volume REAL,
+    confidence REAL,
+    actual_open REAL,
+    actual_high REAL,
+    actual_low REAL,
+    actual_close REAL,
+    actual_volume REAL,
+    scored_at REAL
+);
+CREATE INDEX IF NOT EXISTS predictions_by_user ON predictions (user, created_at);
+CREATE INDEX IF NOT EXISTS predictions_by_target ON predictions (symbol, frequency, target_ts);
+CREATE INDEX IF NOT EXISTS predictions_unscored ON predictions (target_ts) WHERE scored_at IS NULL;
+CREATE TABLE IF NOT EXISTS prediction_counts (
+    user TEXT PRIMARY KEY,
+    total INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+_INSERT = f"INSERT INTO predictions ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+_COUNT = ("INSERT INTO prediction_counts VALUES (?, ?) "
+          "ON CONFLICT(user) DO UPDATE SET total = total + excluded.total")
+
+
+def encode_cursor(created_at, row_id):
+    return base64.urlsafe_b64encode(f"{created_at!r}:{row_id}".encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Returns (created_at, id) from an opaque history cursor; raises ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.split(':')
+        return float(created_at), int(row_id)
+    except (TypeError, UnicodeDecodeError, ValueError, base64.binascii.Error):
+        raise ValueError("Invalid cursor")
+
+
+class PredictionStore:
+    """
+    Prediction history backed by SQLite in WAL mode.
+
+    `record` only enqueues; a background writer commits queued predictions in batches so
+    request handlers never wait on disk. History pages are read by keyset on
+    (created_at, id), so page N costs the same as page 1 regardless of history length.
+    """
+
+    def __init__(self, path=STORE_PATH, batch_size=WRITE_BATCH, flush_ms=WRITE_FLUSH_MS):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_wait = flush_ms / 1000.0
+        self._local = threading.local()
+        self._queue = queue.Queue(maxsize=MAX_QUEUED)
+        self._writer = None
+        self._writer_guard = threading.Lock()
+        self.written = 0
+        self.batches = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._conn() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # --- Writes ---
+    def record(self, prediction):
+        """Queues one prediction (a dict keyed by COLUMNS) for the background writer."""
+        if prediction.get('created_at') is None:
+            prediction = dict(prediction, created_at=time.time())
+        self._ensure_writer()
+        self._queue.put(tuple(prediction.get(column) for column in COLUMNS))
+
+    def _ensure_writer(self):
+        if self._writer is None:
+            with self._writer_guard:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name="prediction-store-writer", daemon=True)
+                    self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            rows = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_wait
+            while len(rows) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    rows.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                counts = {}
+                for row in rows:
+                    counts[row[0]] = counts.get(row[0], 0) + 1
+                with self._conn() as conn:
+                    conn.executemany(_INSERT, rows)
+                    conn.executemany(_COUNT, counts.items())
+                self.written += len(rows)
+                self.batches += 1
+            except sqlite3.Error as e:
+                print(f"Error writing {len(rows)} predictions: {e}")
+            finally:
+                for _ in rows:
+                    self._queue.task_done()
+
+    def flush(self):
+        """Blocks until every queued prediction has been written."""
+        self._queue.join()
+
+    # --- Reads ---
+    def history(self, user, limit=DEFAULT_PAGE_SIZE, cursor=None):
+        """
+        Returns (rows, next_cursor) for one page of a user's predictions, newest first.
+        `next_cursor` is None on the last page. Raises ValueError for a malformed cursor.
+        """
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        if cursor:
+            created_at, row_id = decode_cursor(cursor)
+            rows = self._conn().execute(
+                "SELECT * FROM predictions WHERE user = ? AND (created_at, id) < (?, ?) "
+                "ORDER BY created_at DESC, id DESC LIMIT ?",
+                (user, created_at, row_id, limit + 1)).fetchall()
+        else:
+            rows = self._conn().execute(
+                "SELECT * FROM predictions WHERE user = ? ORDER BY created_at DESC, id DESC LIMIT ?",
+                (user, limit + 1)).fetchall()
+        rows = [dict(row) for row in rows]
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1]['created_at'], rows[-1]['id'])
+
+    def get(self, row_id):
+        row = self._conn().execute("SELECT * FROM predictions WHERE id = ?", (row_id,)).fetchone()
+        return dict(row) if row else None
+
+    def total(self, user):
+        """Number of predictions recorded for `user` (kept as a running count)."""
+        row = self._conn().execute("SELECT total FROM prediction_counts WHERE user = ?", (user,)).fetchone()
+        return row[0] if row else 0
+
+    def due(self, now, intervals, limit, after=None):
+        """
+        Unscored predictions whose target candle has closed by `now`, oldest first, starting
+        after the (target_ts, id) cursor `after` when given. `intervals` maps frequency ->
+        candle seconds; other frequencies are never due. Maturity is filtered here so
+        immature rows cannot crowd matured ones out of `limit`.
+        """
+        if not intervals:
+            return []
+        matured = " OR ".join("(frequency = ? AND target_ts <= ?)" for _ in intervals)
+        params = [value for frequency, seconds in intervals.items() for value in (frequency, now - seconds)]
+        start = "AND (target_ts, id) > (?, ?) " if after is not None else ""
+        return self._conn().execute(
+            "SELECT id, user, symbol, frequency, target_ts, base_price, predicted_close FROM predictions "
+            f"WHERE scored_at IS NULL AND target_ts <= ? AND ({matured}) {start}ORDER BY target_ts, id LIMIT ?",
+            (now - min(intervals.values()), *params, *(after or ()), limit)).fetchall()
+
+    def stats(self):
+        return {"queued": self._queue.qsize(), "written": self.written, "batches": self.batches}
+
+
+_store = None
+_store_guard = threading.Lock()
+
+
+def get_store():
+    """Returns the shared PredictionStore, opening it on first use."""
+    global _store
+    if _store is None:
+        with _store_guard:
+            if _store is None:
+                _store = PredictionStore()
+    return _store
@@ -0,0 +1,241 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+import metrics
+
+# --- Configuration ---
+# -----------------------------------------------------------------------------
+ENABLED = os.getenv("RESPONSE_CACHE", "1").lower() not in ("0", "false", "no")
+# Shared on-disk tier (survives restarts, shared by pre-forked workers); empty disables it.
+DISK_PATH = os.getenv("RESPONSE_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'response_cache.sqlite'))
+# Entries kept in the in-process tier; least recently used are evicted first.
+MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+# Background revalidations running at once.
+REFRESH_WORKERS = int(os.getenv("RESPONSE_CACHE_REFRESH_WORKERS", "2"))
+# Per-endpoint lifetimes: ticks change every few seconds, daily history once a day.
+TICK_TTL = float(os.getenv("RESPONSE_CACHE_TICK_TTL", "5"))
+TICK_STALE = float(os.getenv("RESPONSE_CACHE_TICK_STALE", "30"))
+HISTORY_TTL = float(os.getenv("RESPONSE_CACHE_HISTORY_TTL", "3600"))
+HISTORY_STALE = float(os.getenv("RESPONSE_CACHE_HISTORY_STALE", "3600"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    fresh_until REAL NOT NULL,
+    stale_until REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def is_cacheable(value):
+    """api_client reports failures as {'error': ...} dicts; those are never cached."""
+    return not (isinstance(value, dict) and 'error' in value)
+
+
+class _Flight:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ResponseCache:
+    """
+    Two-tier cache for upstream responses.
+
+    Lookups try an in-process LRU first, then a SQLite file shared by every worker. An
+    entry is fresh for `ttl` seconds and then stale for `stale` more: a stale hit is
+    returned immediately while one background fetch revalidates it. Concurrent misses for
+    the same key are coalesced, so only one caller goes upstream and the rest wait for its
+    result. Values must be JSON-serializable and are shared between callers, so treat them
+    as read-only.
+    """
+
+    def __init__(self, disk_path=DISK_PATH, max_entries=MAX_ENTRIES, refresh_workers=REFRESH_WORKERS):
+        self.disk_path = disk_path or None
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._local = threading.local()
+        self._refresher = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="response-cache")
+        self._writes = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0}
+        if self.disk_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.disk_path)), exist_ok=True)
+
+    # --- Disk tier ---
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        # A connection must not cross a fork; pre-forked workers open their own.
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.disk_path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _disk_get(self, key):
+        if not self.disk_path:
+            return None
+        try:
+            row = self._conn().execute(
+                "SELECT value, fresh_until, stale_until FROM responses WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            print(f"Response cache read failed: {e}")
+            return None
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1], row[2]
+
+    def _disk_put(self, key, value, fresh_until, stale_until):
+        if not self.disk_path:
+            return
+        try:
+            with self._conn() as conn:
+                conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                             (key, json.dumps(value, separators=(',', ':')), fresh_until, stale_until))
+                self._writes += 1
+                if self._writes % 256 == 0:
+                    conn.execute("DELETE FROM responses WHERE stale_until < ?", (time.time(),))
+        except sqlite3.Error as e:
+            print(f"Response cache write failed: {e}")
+
+    # --- Memory tier ---
+    def _memory_get(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+            return entry
+
+    def _memory_put(self, key, entry):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _lookup(self, key):
+        now = time.time()
+        entry = self._memory_get(key)
+        if entry is not None and now < entry[1]:
+            return entry, 'memory'
+        # Not fresh here; another worker may already have refreshed it on disk.
+        shared = self._disk_get(key)
+        if shared is not None and now < shared[2] and (entry is None or shared[1] > entry[1]):
+            self._memory_put(key, shared)
+            return shared, 'disk'
+        return entry, 'memory' if entry is not None else None
+
+    # --- Fetching ---
+    def _fetch(self, key, fetch, ttl, stale, cacheable):
+        """Runs `fetch` once for all concurrent callers of `key`; stores cacheable results."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.stats["coalesced"] += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        try:
+            flight.value = fetch()
+            if cacheable(flight.value):
+                now = time.time()
+                entry = (flight.value, now + ttl, now + ttl + stale)
+                self._memory_put(key, entry)
+                self._disk_put(key, *entry)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def _revalidate(self, key, fetch, ttl, stale, cacheable):
+        with self._lock:
+            if key in self._flights:
+                return
+        def refresh():
+            try:
+                self._fetch(key, fetch, ttl, stale, cacheable)
+            except Exception as e:
+                print(f"Background refresh of {key} failed: {e}")
+        self._refresher.submit(refresh)
+
+    def get_or_fetch(self, key, fetch, ttl, stale=0.0, cacheable=is_cacheable):
+        """Returns the cached value for `key`, calling fetch() on a miss (or in the background when stale)."""
+        entry, tier = self._lookup(key)
+        now = time.time()
+        if entry is not None:
+            value, fresh_until, stale_until = entry
+            if now < fresh_until:
+                self.stats[f"{tier}_hits"] += 1
+                metrics.cache_event('response', True)
+                return value
+            if now < stale_until:
+                self.stats["stale_hits"] += 1
+                metrics.cache_event('response', True)
+                self._revalidate(key, fetch, ttl, stale, cacheable)
+                return value
+        self.stats["misses"] += 1
+        metrics.cache_event('response', False)
+        return self._fetch(key, fetch, ttl, stale, cacheable)
+
+    def invalidate(self, prefix=''):
+        with self._lock:
+            for key in [k for k in self._memory if k.startswith(prefix)]:
+                del self._memory[key]
+        if self.disk_path:
+            with self._conn() as conn:
+                conn.execute("DELETE FROM responses WHERE key >= ? AND key < ?", (prefix, prefix + '\uffff'))
+
+
+_cache = None
+_cache_guard = threading.Lock()
+
+
+def get_cache():
+    """Returns the shared ResponseCache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_guard:
+            if _cache is None:
+                _cache = ResponseCache()
+    return _cache
+
+
+def cached(ttl, stale=0.0, cacheable=is_cacheable):
+    """
+    Caches a function's results by its arguments (which must be JSON-serializable).
+    Results failing `cacheable` (error dicts by default) are returned but not stored.
+    """
+    def decorator(f):
+        if not ENABLED:
+            return f
+        name = f"{f.__module__}.{f.__qualname__}"
+
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            key = f"{name}:{json.dumps([args, kwargs], sort_keys=True, separators=(',', ':'), default=str)}"
+            return get_cache().get_or_fetch(key, lambda: f(*args, **kwargs), ttl, stale, cacheable)
+        wrapper.uncached = f
+        return wrapper
+    return decorator
@@ -0,0 +1,142 @@
+import base64
+import gzip
+import json
+import os
+
+import numpy as np
+from flask import Response, request
+
+try:
+    import orjson
+except ImportError:  # optional: ~5-10x faster than the stdlib encoder
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional: only needed for format=msgpack
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:  # optional: gzip is always available
+    brotli = None
+
+# --- Configuration ---
+# -----------------------------------------------------------------------------
+# Bodies smaller than this are sent uncompressed; the header overhead is not worth it.
+MIN_COMPRESS_BYTES = int(os.getenv("RESPONSE_MIN_COMPRESS_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "5"))
+BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", "4"))
+
+# json: the endpoint's usual list of records. columnar: {field: [values]}.
+# f32: columnar with numeric columns packed as base64 little-endian binary.
+# msgpack: columnar, MessagePack-encoded, numeric columns as raw binary.
+FORMATS = ('json', 'columnar', 'f32', 'msgpack')
+MSGPACK_TYPES = ('application/msgpack', 'application/x-msgpack')
+
+
+class UnsupportedFormat(Exception):
+    """Raised when a client asks for a format this server cannot produce."""
+
+
+def requested_format():
+    """Response format from ?format=, or msgpack when the Accept header asks for it."""
+    fmt = request.args.get('format')
+    if fmt is None:
+        accepted = request.accept_mimetypes
+        if any(accepted[mime] > accepted['application/json'] for mime in MSGPACK_TYPES):
+            return 'msgpack'
+        return 'json'
+    fmt = fmt.lower()
+    if fmt not in FORMATS:
+        raise UnsupportedFormat(f"Unknown format '{fmt}'. Use one of: {', '.join(FORMATS)}.")
+    if fmt == 'msgpack' and msgpack is None:
+        raise UnsupportedFormat("MessagePack is not available on this server.")
+    return fmt
+
+
+def to_columns(records, fields):
+    """[{a: 1, b: 2}, {a: 3, b: 4}] -> {a: [1, 3], b: [2, 4]}"""
+    return {field: [record[field] for record in records] for field in fields}
+
+
+def _column_dtype(array):
+    if array.dtype.kind in 'iu' and (array.size == 0 or (array.min() >= 0 and array.max() < 2 ** 32)):
+        # Unix timestamps fit in uint32 (until 2106); float32 would round them to ~2 minutes.
+        return array.astype('<u4')
+    return array.astype('<f4')
+
+
+def pack_columns(columns, raw=False):
+    """
+    Packs numeric columns as little-endian binary: {"dtype": "<f4", "data": base64}. Readable in a
+    browser with `new Float32Array(Uint8Array.from(atob(data), c => c.charCodeAt(0)).buffer)`.
+    With raw=True the data stays bytes (for MessagePack). Non-numeric columns are left as lists.
+    """
+    packed = {}
+    for field, values in columns.items():
+        array = np.asarray(values)
+        if array.dtype.kind not in 'iuf':
+            packed[field] = values
+            continue
+        array = _column_dtype(array)
+        data = array.tobytes()
+        packed[field] = {"dtype": array.dtype.str, "length": len(array),
+                         "data": data if raw else base64.b64encode(data).decode('ascii')}
+    return packed
+
+
+def dumps(payload):
+    """Compact JSON bytes; uses orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, separators=(',', ':')).encode()
+
+
+def compress(body):
+    """Compresses `body` for the client's Accept-Encoding; returns (body, content_encoding or None)."""
+    if len(body) < MIN_COMPRESS_BYTES:
+        return body, None
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return brotli.compress(body, quality=BROTLI_QUALITY), 'br'
+    if accepted['gzip']:
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0), 'gzip'
+    return body, None
+
+
+def shape_columns(columns, fmt):
+    """Represents a {field: [values]} dict in a columnar format."""
+    if fmt == 'f32':
+        return pack_columns(columns)
+    if fmt == 'msgpack':
+        return pack_columns(columns, raw=True)
+    return columns
+
+
+def shape_records(records, fields, fmt):
+    """Represents a list of records in `fmt`: unchanged for json, columns otherwise."""
+    if fmt == 'json':
+        return records
+    return shape_columns(to_columns(records, fields), fmt)
+
+
+def encode(payload, fmt):
+    """Returns (body bytes, mimetype) for a payload whose columnar parts are already shaped."""
+    if fmt == 'msgpack':
+        return msgpack.packb(payload, use_bin_type=True), 'application/msgpack'
+    return dumps(payload), 'application/json'
+
+
+def respond_bytes(body, mimetype, status=200):
+    body, encoding = compress(body)
+    response = Response(body, status=status, mimetype=mimetype)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept, Accept-Encoding'
+    return response
+
+
+def respond_as(payload, fmt='json', status=200):
+    """Encodes `payload` for `fmt` and compresses it for the client."""
+    return respond_bytes(*encode(payload, fmt), status=status)
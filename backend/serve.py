@@ -0,0 +1,243 @@
+import gc
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+# --- Configuration ---
+# -----------------------------------------------------------------------------
+HOST = os.getenv("SERVE_HOST", "0.0.0.0")
+PORT = int(os.getenv("SERVE_PORT", "5000"))
+WORKERS = int(os.getenv("SERVE_WORKERS", "0")) or (os.cpu_count() or 1)
+BACKLOG = int(os.getenv("SERVE_BACKLOG", "512"))
+# Seconds a worker gets to finish in-flight requests after SIGTERM before it is killed.
+GRACEFUL_TIMEOUT = float(os.getenv("SERVE_GRACEFUL_TIMEOUT", "30"))
+
+# Split the cores between workers so N processes x M intra-op threads never exceeds the
+# machine. Must happen before numpy / onnxruntime / TensorFlow create their thread pools.
+_threads_per_worker = str(max(1, (os.cpu_count() or 1) // WORKERS))
+os.environ.setdefault("INFERENCE_THREADS", _threads_per_worker)
+for _var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(_var, _threads_per_worker)
+
+from werkzeug.serving import make_server  # noqa: E402
+
+
+def _listen(host, port):
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(BACKLOG)
+    sock.set_inheritable(True)
+    return sock
+
+
+def preload(backend):
+    """
+    Loads everything workers should share copy-on-write, then freezes the GC so collections
+    in the workers do not write to (and so un-share) the pages holding those objects.
+    """
+    import inference_runtime
+    import prediction_engine
+
+    if backend == 'keras':
+        # TensorFlow's runtime threads do not survive fork(): a worker would hang on its first
+        # predict. Each worker loads its own Keras models instead (see onnx_export.py).
+        print("PREDICTION_BACKEND=keras is not fork-safe; models load per worker. "
+              "Export to ONNX and set PREDICTION_BACKEND=onnx to share them.")
+    else:
+        # Sessions shared with the workers must not own thread pools (see prepare_for_fork).
+        inference_runtime.prepare_for_fork()
+        failed = prediction_engine.preload_models()
+        print(f"Preloaded {len(prediction_engine.registry.keys())} models in the parent"
+              + (f" ({len(failed)} failed)" if failed else ""))
+    gc.collect()
+    gc.freeze()
+
+
+class Worker:
+    """One forked process serving the shared listening socket."""
+
+    def __init__(self, app, sock, backend):
+        self.app = app
+        self.sock = sock
+        self.backend = backend
+        self.pid = None
+        self.stopping_since = None
+
+    def spawn(self):
+        # fork() copies only the calling thread. Background threads (market refresher,
+        # prediction job workers, store writers, schedulers) are therefore started lazily by
+        # their ensure_started/_ensure_* methods on a worker's first request, never in this
+        # parent; a thread started here would be missing in every child while its state
+        # (locks, queues) was copied as if it were running.
+        pid = os.fork()
+        if pid:
+            self.pid = pid
+            return self
+        code = 0
+        try:
+            self._run()
+        except Exception as e:
+            print(f"Worker {os.getpid()} crashed: {e}")
+            code = 1
+        finally:
+            os._exit(code)
+
+    def _run(self):
+        import app as flask_app
+
+        for sig in (signal.SIGHUP, signal.SIGCHLD):
+            signal.signal(sig, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        gc.enable()
+
+        server = make_server(HOST, PORT, self.app, threaded=True, fd=self.sock.fileno())
+        # Track request threads so server_close() can wait for in-flight requests.
+        server.daemon_threads = False
+        server.block_on_close = True
+
+        def drain():
+            # SSE streams never finish on their own; end them so server_close() can return.
+            flask_app.stream_hub.close()
+            server.shutdown()
+
+        def shutdown(signum, frame):
+            threading.Thread(target=drain, daemon=True).start()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        if self.backend == 'keras':
+            import prediction_engine
+            prediction_engine.preload_models()
+        print(f"Worker {os.getpid()} serving on http://{HOST}:{PORT}")
+        server.serve_forever()
+        server.server_close()
+
+    def stop(self):
+        if self.stopping_since is None:
+            self.stopping_since = time.monotonic()
+            _signal(self.pid, signal.SIGTERM)
+
+    def overdue(self):
+        return self.stopping_since is not None and time.monotonic() - self.stopping_since > GRACEFUL_TIMEOUT
+
+
+def _signal(pid, sig):
+    try:
+        os.kill(pid, sig)
+    except ProcessLookupError:
+        pass
+
+
+class Arbiter:
+    """
+    Pre-fork supervisor: keeps `workers` processes alive, rolls them on SIGHUP
+    and drains them on SIGTERM/SIGINT.
+    """
+
+    def __init__(self, app, sock, backend, workers=WORKERS):
+        self.app = app
+        self.sock = sock
+        self.backend = backend
+        self.size = workers
+        self.workers = {}
+        self.retiring = {}
+        self._reload = False
+        self._stop = False
+
+    def _on_hup(self, signum, frame):
+        self._reload = True
+
+    def _on_term(self, signum, frame):
+        self._stop = True
+
+    def spawn(self):
+        worker = Worker(self.app, self.sock, self.backend).spawn()
+        self.workers[worker.pid] = worker
+
+    def reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if not pid:
+                return
+            if self.retiring.pop(pid, None) is None and self.workers.pop(pid, None) is not None and not self._stop:
+                print(f"Worker {pid} exited unexpectedly (status {status}); respawning")
+
+    def rolling_restart(self):
+        """Replaces workers one at a time so the socket always has someone accepting."""
+        import coin_catalog
+        import prediction_engine
+
+        print("SIGHUP: reloading models and restarting workers")
+        # Pick up models added or removed since startup; new workers inherit the rebuilt catalog.
+        coin_catalog.refresh()
+        if self.backend != 'keras':
+            prediction_engine.registry.invalidate()
+            gc.unfreeze()
+            preload(self.backend)
+        for pid, worker in list(self.workers.items()):
+            self.spawn()
+            del self.workers[pid]
+            self.retiring[pid] = worker
+            worker.stop()
+
+    def run(self):
+        signal.signal(signal.SIGHUP, self._on_hup)
+        signal.signal(signal.SIGTERM, self._on_term)
+        signal.signal(signal.SIGINT, self._on_term)
+        for _ in range(self.size):
+            self.spawn()
+
+        while not self._stop:
+            self.reap()
+            if self._reload:
+                self._reload = False
+                self.rolling_restart()
+            while len(self.workers) < self.size and not self._stop:
+                self.spawn()
+            for worker in self.retiring.values():
+                if worker.overdue():
+                    _signal(worker.pid, signal.SIGKILL)
+            time.sleep(0.2)
+
+        print("Shutting down: draining workers")
+        self.retiring.update(self.workers)
+        self.workers = {}
+        for worker in self.retiring.values():
+            worker.stop()
+        while self.retiring:
+            self.reap()
+            for worker in self.retiring.values():
+                if worker.overdue():
+                    _signal(worker.pid, signal.SIGKILL)
+            time.sleep(0.1)
+        self.sock.close()
+
+
+def main():
+    # Nothing allocated from here on needs collecting before the fork; freezing happens in preload().
+    gc.disable()
+    # Preloading is done here, after deciding whether the backend survives fork().
+    os.environ["MODEL_REGISTRY_PRELOAD"] = "false"
+    import app as flask_app
+    from inference_runtime import resolve_backend
+
+    backend = resolve_backend()
+    sock = _listen(HOST, PORT)
+    preload(backend)
+    threads = 1 if backend == 'onnx' else os.environ['INFERENCE_THREADS']
+    print(f"Serving on http://{HOST}:{PORT} with {WORKERS} workers x "
+          f"{threads} inference threads ({backend})")
+    Arbiter(flask_app.app, sock, backend).run()
+    return 0
+
+
+if __name__ == '__main__':
+    # Production entry point: SERVE_WORKERS=4 PREDICTION_BACKEND=onnx python serve.py
+    # kill -HUP <pid> reloads models and rolls the workers; kill -TERM <pid> drains and exits.
+    sys.exit(main())
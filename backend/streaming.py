@@ -0,0 +1,188 @@
+import json
+import os
+import threading
+import time
+
+# --- Configuration ---
+# -----------------------------------------------------------------------------
+HEARTBEAT_SECONDS = float(os.getenv("STREAM_HEARTBEAT_SECONDS", "15"))
+# Per process. Each open stream holds one request thread (and its stack) for as long as the
+# client stays connected, so this is bounded by how many threads a worker can afford.
+MAX_SUBSCRIBERS = int(os.getenv("STREAM_MAX_CLIENTS", "256"))
+TICK_FIELDS = ("price", "change24h", "high24h", "low24h", "volume24h", "marketCap")
+
+
+class TooManySubscribers(Exception):
+    """Raised when the hub is already holding MAX_SUBSCRIBERS clients, or is closed."""
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+def tick_deltas(old_coins, new_coins):
+    """
+    Returns {symbol: {changed fields}} between two coin lists.
+    Coins that did not change are left out.
+    """
+    old_by_symbol = {coin["symbol"]: coin for coin in old_coins}
+    deltas = {}
+    for coin in new_coins:
+        old = old_by_symbol.get(coin["symbol"], {})
+        changed = {field: coin[field] for field in TICK_FIELDS if coin.get(field) != old.get(field)}
+        if changed:
+            deltas[coin["symbol"]] = changed
+    return deltas
+
+
+def forecast_payload(entry):
+    values = entry.values
+    return {
+        "symbol": entry.coin_symbol,
+        "frequency": entry.frequency,
+        "windowEnd": entry.window_end_ts,
+        "targets": entry.target_timestamps(),
+        "open": values[:, 0].astype(float).tolist(),
+        "high": values[:, 1].astype(float).tolist(),
+        "low": values[:, 2].astype(float).tolist(),
+        "close": values[:, 3].astype(float).tolist(),
+        "volume": values[:, 4].astype(float).tolist(),
+    }
+
+
+class Subscriber:
+    """
+    One connected client. Pending updates are conflated per (event, key): a slow client
+    only ever holds the newest value for each symbol, so its backlog is bounded by the
+    number of symbols it follows rather than by how far behind it is.
+    """
+    __slots__ = ("symbols", "frequencies", "pending", "cond", "closed", "conflated")
+
+    def __init__(self, symbols=None, frequencies=()):
+        self.symbols = frozenset(symbols) if symbols else None
+        self.frequencies = frozenset(frequencies)
+        self.pending = {}
+        self.cond = threading.Condition()
+        self.closed = False
+        self.conflated = 0
+
+    def wants(self, symbol):
+        return self.symbols is None or symbol in self.symbols
+
+    def offer(self, key, event, data, merge=False):
+        with self.cond:
+            previous = self.pending.get(key)
+            if previous is not None:
+                self.conflated += 1
+                if merge:
+                    data = {**previous[1], **data}
+            self.pending[key] = (event, data)
+            self.cond.notify()
+
+    def drain(self, timeout):
+        """Waits up to `timeout` seconds and returns all pending (event, data) pairs."""
+        with self.cond:
+            if not self.pending and not self.closed:
+                self.cond.wait(timeout)
+            items = list(self.pending.values())
+            self.pending.clear()
+            return items
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+
+
+class StreamHub:
+    """
+    Fans market and forecast updates out to SSE subscribers.
+
+    There is one upstream loop (the market refresher, which polls every tracked symbol in
+    a single request) and one forecast-cache hook; each update is diffed once and then
+    offered to the subscribers that follow the affected symbol.
+    """
+
+    def __init__(self, market, forecast_cache=None, max_subscribers=MAX_SUBSCRIBERS):
+        self.market = market
+        self.max_subscribers = max_subscribers
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._closed = False
+        market.subscribe(self._on_snapshot)
+        if forecast_cache is not None:
+            forecast_cache.subscribe(self._on_forecast)
+
+    def _targets(self):
+        with self._lock:
+            return list(self._subscribers)
+
+    def _on_snapshot(self, old, new):
+        deltas = tick_deltas(old.coins, new.coins)
+        for subscriber in self._targets():
+            for symbol, changed in deltas.items():
+                if subscriber.wants(symbol):
+                    subscriber.offer(("tick", symbol), "tick", {"symbol": symbol, **changed}, merge=True)
+            subscriber.offer(("global",), "global", new.global_stats)
+
+    def _on_forecast(self, entry):
+        payload = None
+        for subscriber in self._targets():
+            if entry.frequency in subscriber.frequencies and subscriber.wants(entry.coin_symbol):
+                if payload is None:
+                    payload = forecast_payload(entry)
+                subscriber.offer(("forecast", entry.coin_symbol, entry.frequency), "forecast", payload)
+
+    def subscribe(self, symbols=None, frequencies=()):
+        with self._lock:
+            if self._closed or len(self._subscribers) >= self.max_subscribers:
+                raise TooManySubscribers()
+            subscriber = Subscriber(symbols, frequencies)
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        subscriber.close()
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def close(self):
+        """
+        Ends every open stream and refuses new ones, so a draining server is not held
+        open by clients that never disconnect.
+        """
+        with self._lock:
+            self._closed = True
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.close()
+
+    def stream(self, subscriber):
+        """
+        Yields SSE frames for one subscriber: a full snapshot of the followed coins first,
+        then only deltas, with a comment heartbeat while idle.
+        """
+        try:
+            snapshot = self.market.snapshot()
+            coins = [coin for coin in snapshot.coins if subscriber.wants(coin["symbol"])]
+            yield _sse("snapshot", {"coins": coins, "global": snapshot.global_stats})
+            last_sent = time.monotonic()
+            while not subscriber.closed:
+                items = subscriber.drain(HEARTBEAT_SECONDS)
+                if items:
+                    yield "".join(_sse(event, data) for event, data in items)
+                    last_sent = time.monotonic()
+                elif time.monotonic() - last_sent >= HEARTBEAT_SECONDS:
+                    yield ": keep-alive\n\n"
+                    last_sent = time.monotonic()
+        finally:
+            self.unsubscribe(subscriber)
+
+    def stats(self):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        return {
+            "subscribers": len(subscribers),
+            "pending": sum(len(s.pending) for s in subscribers),
+            "conflated": sum(s.conflated for s in subscribers),
+        }
@@ -0,0 +1,265 @@
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+import deadline
+import metrics
+
+load_dotenv()  # API_KEY below is read at import, whichever module imports this first
+
+# --- Configuration ---
+# -----------------------------------------------------------------------------
+BASE_URL = os.getenv("COINDESK_BASE_URL", "https://data-api.coindesk.com")
+API_KEY = os.getenv("COINDESK_API_KEY")
+CONNECT_TIMEOUT = float(os.getenv("COINDESK_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.getenv("COINDESK_READ_TIMEOUT", "10"))
+MAX_RETRIES = int(os.getenv("COINDESK_RETRIES", "3"))
+BACKOFF_BASE = float(os.getenv("COINDESK_BACKOFF_BASE", "0.25"))
+BACKOFF_MAX = float(os.getenv("COINDESK_BACKOFF_MAX", "5"))
+# Requests per second allowed by the API key's quota; 0 disables client-side limiting.
+RATE_LIMIT = float(os.getenv("COINDESK_RATE_LIMIT", "0"))
+RATE_BURST = int(os.getenv("COINDESK_RATE_BURST", "10"))
+POOL_SIZE = int(os.getenv("COINDESK_POOL_SIZE", "20"))
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Transport failures worth another attempt; any other RequestException fails at once.
+RETRY_EXCEPTIONS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                    requests.exceptions.ChunkedEncodingError)
+
+
+class UpstreamError(Exception):
+    """Raised when a CoinDesk request fails after all retries."""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, holding at most `capacity`.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Takes one token and returns how long the caller must wait before using it."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        wait = self.reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+
+class RequestsTransport:
+    """
+    Default transport: one pooled keep-alive `requests.Session` shared by all callers.
+    A transport only needs `get(url, params, timeout)` returning (status, headers, body bytes).
+    """
+
+    def __init__(self, pool_size=POOL_SIZE):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(self, url, params, timeout):
+        response = self.session.get(url, params=params, timeout=timeout)
+        return response.status_code, response.headers, response.content
+
+    def close(self):
+        self.session.close()
+
+
+def _backoff(attempt, retry_after=None):
+    if retry_after is not None:
+        try:
+            return min(BACKOFF_MAX, float(retry_after))
+        except ValueError:
+            pass
+    # Full jitter: uniform in [0, base * 2^attempt], capped.
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+class UpstreamClient:
+    """
+    Shared client for all CoinDesk traffic: pooled connections, timeouts,
+    retry with jittered exponential backoff and a token-bucket rate limiter.
+    """
+
+    def __init__(self, base_url=BASE_URL, api_key=API_KEY, transport=None,
+                 timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), max_retries=MAX_RETRIES,
+                 rate_limiter=None):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.transport = transport or RequestsTransport()
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.rate_limiter = rate_limiter or TokenBucket(RATE_LIMIT, RATE_BURST)
+
+    def _prepare(self, path, params):
+        params = dict(params or {})
+        if self.api_key and "api_key" not in params:
+            params["api_key"] = self.api_key
+        return f"{self.base_url}/{path.lstrip('/')}", params
+
+    def get(self, path, params=None):
+        """
+        Performs a GET and returns the raw response body; raises UpstreamError.
+        Timeouts and retries are cut short by the caller's deadline (see deadline.py).
+        """
+        url, params = self._prepare(path, params)
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            retry_after = None
+            started = time.perf_counter()
+            try:
+                timeout = deadline.capped(self.timeout)
+            except deadline.DeadlineExceeded:
+                raise last_error or UpstreamError("API request skipped: deadline exceeded")
+            try:
+                status, headers, body = self.transport.get(url, params, timeout)
+            except requests.exceptions.RequestException as e:
+                metrics.UPSTREAM_ERRORS.inc(path, type(e).__name__)
+                last_error = UpstreamError(f"API request failed: {e}")
+                if not isinstance(e, RETRY_EXCEPTIONS):
+                    raise last_error
+            else:
+                metrics.UPSTREAM_SECONDS.observe(time.perf_counter() - started, path)
+                if status < 400:
+                    return body
+                metrics.UPSTREAM_ERRORS.inc(path, f"http_{status}")
+                last_error = UpstreamError(f"API request failed with HTTP {status}", status)
+                if status not in RETRY_STATUSES:
+                    raise last_error
+                retry_after = headers.get("Retry-After") if headers else None
+            if attempt < self.max_retries:
+                wait = _backoff(attempt, retry_after)
+                try:
+                    if wait >= deadline.remaining(wait + 1):
+                        break  # no time left for another attempt
+                except deadline.DeadlineExceeded:
+                    break
+                time.sleep(wait)
+        raise last_error
+
+    def get_json(self, path, params=None):
+        body = self.get(path, params)
+        try:
+            return json.loads(body)
+        except ValueError as e:
+            raise UpstreamError(f"Invalid JSON from API: {e}")
+
+    def close(self):
+        self.transport.close()
+
+
+class AsyncUpstreamClient:
+    """
+    asyncio variant sharing the same configuration and rate limiter.
+    Uses aiohttp when it is installed, otherwise runs the sync client in a worker thread.
+    """
+
+    def __init__(self, sync_client=None):
+        self.sync_client = sync_client or get_client()
+        self._session = None
+
+    async def _aiohttp_get(self, aiohttp, url, params):
+        if self._session is None or self._session.closed:
+            connect, read = self.sync_client.timeout
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(sock_connect=connect, sock_read=read),
+                connector=aiohttp.TCPConnector(limit=POOL_SIZE))
+        async with self._session.get(url, params=params) as response:
+            return response.status, response.headers, await response.read()
+
+    async def get(self, path, params=None):
+        try:
+            import aiohttp
+        except ImportError:
+            return await asyncio.to_thread(self.sync_client.get, path, params)
+
+        client = self.sync_client
+        url, params = client._prepare(path, params)
+        last_error = None
+        for attempt in range(client.max_retries + 1):
+            await client.rate_limiter.acquire_async()
+            retry_after = None
+            started = time.perf_counter()
+            try:
+                status, headers, body = await self._aiohttp_get(aiohttp, url, params)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                metrics.UPSTREAM_ERRORS.inc(path, type(e).__name__)
+                last_error = UpstreamError(f"API request failed: {e}")
+            else:
+                metrics.UPSTREAM_SECONDS.observe(time.perf_counter() - started, path)
+                if status < 400:
+                    return body
+                metrics.UPSTREAM_ERRORS.inc(path, f"http_{status}")
+                last_error = UpstreamError(f"API request failed with HTTP {status}", status)
+                if status not in RETRY_STATUSES:
+                    raise last_error
+                retry_after = headers.get("Retry-After")
+            if attempt < client.max_retries:
+                await asyncio.sleep(_backoff(attempt, retry_after))
+        raise last_error
+
+    async def get_json(self, path, params=None):
+        body = await self.get(path, params)
+        try:
+            return json.loads(body)
+        except ValueError as e:
+            raise UpstreamError(f"Invalid JSON from API: {e}")
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+
+_client = None
+_client_guard = threading.Lock()
+
+
+def get_client():
+    """Returns the process-wide UpstreamClient, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_guard:
+            if _client is None:
+                _client = UpstreamClient()
+    return _client
+
+
+def set_client(client):
+    """Replaces the process-wide client, e.g. with one using a stand-in transport."""
+    global _client
+    with _client_guard:
+        _client = client